@@ -0,0 +1,76 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from sys import path as sysPath                   #DO_NOT_DISTRIBUTE
+from os.path import abspath, dirname, join        #DO_NOT_DISTRIBUTE
+sysPath.insert(0, join(dirname(abspath(__file__)), '..'))  #DO_NOT_DISTRIBUTE
+from random import Random
+from time import time
+
+from meresco.xml.normalize import Normalize
+
+# Compares Normalize.process() with trying every rule one after another (as it did
+# before) for growing rule sets; values match a random rule, or nothing. Date rules
+# all start with a digit, prefixed rules with one of 26 letters.
+# Usage: python3 normalizebenchmark.py [values]
+
+def rules(count):
+    return [(r'(\d{4})-(\d{2})-(\d{2}) code%d$' % i, '%%s%%s%%s:%d' % i) for i in range(count)]
+
+def prefixedRules(count):
+    return [(r'%s%d:(\d+)$' % (chr(ord('a') + i % 26), i), '%%s:%d' % i) for i in range(count)]
+
+def prefixedValue(random, count):
+    i = random.randrange(count)
+    return '%s%d:123' % (chr(ord('a') + i % 26), i)
+
+def loop(normalize, value):
+    for rule in normalize.rules:
+        match = rule[0].match(value)
+        if match:
+            return rule[1] % match.groups()
+    return value
+
+def run(description, process, values):
+    t0 = time()
+    for value in values:
+        process(value)
+    seconds = time() - t0
+    print('%-45s %8d values %7.2fs %10.0f values/s' % (description, len(values), seconds, len(values) / seconds))
+
+if __name__ == '__main__':
+    from sys import argv
+    count = int(argv[1]) if len(argv) > 1 else 20000
+    random = Random(42)
+    for ruleCount in [10, 100, 500]:
+        for kind, ruleSet, value in [
+                ('date', rules(ruleCount), lambda: '2020-01-01 code%d' % random.randrange(ruleCount)),
+                ('prefixed', prefixedRules(ruleCount), lambda: prefixedValue(random, ruleCount))]:
+            normalize = Normalize(ruleSet)
+            matching = [value() for i in range(count)]
+            nonMatching = ['no match %d' % i for i in range(count)]
+            for description, values in [('matching', matching), ('no match', nonMatching)]:
+                assert [loop(normalize, value) for value in values[:100]] == [normalize.process(value) for value in values[:100]]
+                run('%d %s rules, %s, loop' % (ruleCount, kind, description), lambda value: loop(normalize, value), values)
+                run('%d %s rules, %s, Normalize' % (ruleCount, kind, description), normalize.process, values)
@@ -0,0 +1,75 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from sys import path as sysPath                   #DO_NOT_DISTRIBUTE
+from os.path import abspath, dirname, join        #DO_NOT_DISTRIBUTE
+sysPath.insert(0, join(dirname(abspath(__file__)), '..'))  #DO_NOT_DISTRIBUTE
+
+from os import remove
+from os.path import getsize
+from tempfile import mkstemp
+from time import time
+
+from meresco.xml.subtreestreebuilder import SimpleSaxFileParser
+
+# Compares feeding a file to SimpleSaxFileParser in 4096-byte reads (as it did
+# before) with memory-mapped and native (lxml reads the file) input, for both
+# engines. Usage: python3 simplesaxfileparserbenchmark.py [megabytes]
+
+RECORD = '''<record><header><identifier>oai:example.org:%d</identifier><datestamp>2020-01-01T00:00:00Z</datestamp></header><metadata><oai_dc:dc xmlns:oai_dc="http://www.openarchives.org/OAI/2.0/oai_dc/" xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:title>Title of record %d</dc:title><dc:creator>Some, Author</dc:creator><dc:subject>benchmarks</dc:subject><dc:description>%s</dc:description></oai_dc:dc></metadata></record>
+'''
+
+def generate(megabytes):
+    fd, filename = mkstemp(suffix='.xml')
+    with open(fd, 'w') as f:
+        f.write('<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/"><ListRecords>\n')
+        i = 0
+        while f.tell() < megabytes * 1024 * 1024:
+            f.write(RECORD % (i, i, 'lorem ipsum dolor sit amet ' * 10))
+            i += 1
+        f.write('</ListRecords></OAI-PMH>\n')
+    return filename, i
+
+def run(description, stream, **kwargs):
+    count = [0]
+    def callback(subtree):
+        count[0] += 1
+    t0 = time()
+    SimpleSaxFileParser(stream, '/oai:OAI-PMH/oai:ListRecords/oai:record', callback, **kwargs).start()
+    seconds = time() - t0
+    print('%-40s %8d records %7.2fs %7.1f MB/s' % (description, count[0], seconds, getsize(filename) / seconds / 1024 / 1024))
+
+if __name__ == '__main__':
+    from sys import argv
+    filename, records = generate(int(argv[1]) if len(argv) > 1 else 50)
+    try:
+        for engine in ['target', 'native']:
+            with open(filename, 'rb') as f:
+                run('%s engine, 4096 byte reads' % engine, f, engine=engine, chunkSize=4096, feedSize=4096)
+            with open(filename, 'rb') as f:
+                run('%s engine, 64k reads' % engine, f, engine=engine)
+            run('%s engine, mmap 1M feeds' % engine, filename, engine=engine, fileInput='mmap', feedSize=1024 * 1024)
+            run('%s engine, native file input' % engine, filename, engine=engine, fileInput='native')
+    finally:
+        remove(filename)
@@ -0,0 +1,74 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from sys import argv, path as sysPath             #DO_NOT_DISTRIBUTE
+from os.path import abspath, dirname, join        #DO_NOT_DISTRIBUTE
+sysPath.insert(0, join(dirname(abspath(__file__)), '..'))  #DO_NOT_DISTRIBUTE
+from time import time
+
+from lxml.etree import XML
+
+from meresco.xml.namespaces import namespaces
+from meresco.xml.xpathextractor import XPathExtractor
+
+# Compares XPathExtractor.extract() with calling namespaces.xpath() for each of 20
+# paths on an OAI-PMH record with Dublin Core metadata.
+# Usage: python3 xpathextractorbenchmark.py [records]
+
+ELEMENTS = ['title', 'creator', 'subject', 'description', 'publisher', 'contributor', 'date', 'type',
+        'format', 'identifier', 'source', 'language', 'relation', 'coverage', 'rights']
+
+PATHS = dict(
+    [('identifier', 'oai:header/oai:identifier/text()'),
+    ('datestamp', 'oai:header/oai:datestamp/text()'),
+    ('status', 'oai:header/@status'),
+    ('sets', 'oai:header/oai:setSpec/text()'),
+    ('languages', 'oai:metadata/oai_dc:dc/dc:title/@xml:lang')] +
+    [(element, 'oai:metadata/oai_dc:dc/dc:%s/text()' % element) for element in ELEMENTS])
+
+def record(repeat):
+    return XML('''<record %s %s %s><header><identifier>id:1</identifier><datestamp>2026-01-01</datestamp>
+<setSpec>a</setSpec><setSpec>b</setSpec></header><metadata><oai_dc:dc>%s</oai_dc:dc></metadata></record>''' % (
+            'xmlns="%s"' % namespaces.oai, namespaces.xmlns_oai_dc, namespaces.xmlns_dc,
+            ''.join('<dc:%s xml:lang="en">%s %d</dc:%s>' % (element, element, i, element) for element in ELEMENTS for i in range(repeat))))
+
+def separately(node):
+    return {name: namespaces.xpath(node, path) for name, path in PATHS.items()}
+
+def measure(function, node, records):
+    t0 = time()
+    for i in range(records):
+        function(node)
+    return records / (time() - t0)
+
+def main(records):
+    extractor = XPathExtractor(PATHS)
+    for repeat in [1, 3, 10]:
+        node = record(repeat)
+        assert separately(node) == extractor.extract(node)
+        print('%2d values per element: %7.0f records/s before, %7.0f records/s now' % (
+                repeat, measure(separately, node, records), measure(extractor.extract, node, records)))
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 5000)
@@ -0,0 +1,63 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from sys import argv, path as sysPath             #DO_NOT_DISTRIBUTE
+from os.path import abspath, dirname, join        #DO_NOT_DISTRIBUTE
+sysPath.insert(0, join(dirname(abspath(__file__)), '..'))  #DO_NOT_DISTRIBUTE
+from time import time
+
+from lxml.etree import XML
+
+from meresco.xml.namespaces import namespaces
+
+# Compares xpathFirst with taking the first of the complete result (as it did
+# before) on records with a growing number of repeated fields.
+# Usage: python3 xpathfirstbenchmark.py [evaluations]
+
+def record(count):
+    return XML('<oai_dc:dc xmlns:oai_dc="%s" xmlns:dc="%s">%s</oai_dc:dc>' % (
+            namespaces.oai_dc, namespaces.dc,
+            ''.join('<dc:subject>subject %d</dc:subject>' % i for i in range(count))))
+
+def firstOfAll(node, path):
+    nodes = namespaces.xpath(node, path)
+    return nodes[0] if nodes else None
+
+def measure(function, node, path, evaluations):
+    t0 = time()
+    for i in range(evaluations):
+        function(node, path)
+    return evaluations / (time() - t0)
+
+def main(evaluations):
+    for path in ['dc:subject/text()', '//dc:subject/text()']:
+        print(path)
+        for count in [1, 10, 100, 1000]:
+            node = record(count)
+            assert firstOfAll(node, path) == namespaces.xpathFirst(node, path)
+            print('%5d subjects: %9.0f evaluations/s before, %9.0f evaluations/s now' % (
+                    count, measure(firstOfAll, node, path, evaluations), measure(namespaces.xpathFirst, node, path, evaluations)))
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 20000)
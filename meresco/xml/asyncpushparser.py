@@ -0,0 +1,140 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from asyncio import sleep, get_running_loop
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from meresco.xml.namespaces import namespaces as _namespaces
+from meresco.xml.subtreestreebuilder import createSubtreesParser, DEFAULT_FEED_SIZE, DEFAULT_CHUNK_SIZE, TARGET_ENGINE
+
+
+# Reads from an asyncio StreamReader (anything with an awaitable read(n)) or an async
+# iterable of chunks, and is consumed with 'async for record in parser'.
+#
+# Data is fed feedSize bytes at a time, yielding to the event loop in between; with
+# offload=True parsing is done in a worker thread instead. An lxml parser must stay in
+# the thread that created it, so that thread is dedicated to this parser. A slice is
+# only fed when no records are waiting, so a slow consumer stops the reading and the
+# queue never holds more than the records of one slice: it is bounded by feedSize.
+#
+# Breaking out of the loop early does not close the parser; use 'async with parser'
+# or await aclose() to release the worker thread. An error does so too.
+class AsyncPushParser(object):
+    def __init__(self, stream, elementPath, namespaces=_namespaces, minimalNsmap=False, feedSize=DEFAULT_FEED_SIZE, engine=TARGET_ENGINE, readSize=DEFAULT_CHUNK_SIZE, offload=False, raw=False, fields=None):
+        createParser = lambda: createSubtreesParser(
+            paths={'record': elementPath},
+            engine=engine,
+            namespaces=namespaces,
+            minimalNsmap=minimalNsmap,
+            raw=raw,
+            fields=fields)
+        self._executor = ThreadPoolExecutor(max_workers=1) if offload else None
+        try:
+            self._parser, self._builder = createParser() if self._executor is None else self._executor.submit(createParser).result()
+        except BaseException:
+            self._shutdown()
+            raise
+        self._read = _reader(stream, readSize)
+        self._feedSize = feedSize
+        self._records = deque()
+        self._data = b''
+        self._position = 0
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            while not self._records:
+                if self._closed:
+                    raise StopAsyncIteration
+                if self._position >= len(self._data):
+                    self._data, self._position = await self._read(), 0
+                    if not self._data:
+                        await self._close()
+                        continue
+                data = self._data[self._position:self._position + self._feedSize] if len(self._data) > self._feedSize else self._data
+                self._position += len(data)
+                await self._feed(data)
+        except BaseException:
+            self._release()
+            raise
+        return self._records.popleft()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        self._release()
+
+    async def _feed(self, data):
+        if self._executor is None:
+            self._parser.feed(data)
+            await sleep(0)
+        else:
+            await get_running_loop().run_in_executor(self._executor, self._parser.feed, data)
+        self._collect()
+
+    async def _close(self):
+        self._closed = True
+        try:
+            if self._executor is None:
+                self._parser.close()
+            else:
+                await get_running_loop().run_in_executor(self._executor, self._parser.close)
+        finally:
+            self._shutdown()
+        self._collect()
+
+    def _collect(self):
+        self._records.extend(subtree for id, subtree in self._builder.getSubtrees())
+
+    def _release(self):
+        self._closed = True
+        self._records.clear()
+        self._shutdown()
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _reader(stream, readSize):
+    if hasattr(stream, 'read'):
+        async def read():
+            return await stream.read(readSize)
+        return read
+    chunks = stream.__aiter__()
+    async def read():
+        async for chunk in chunks:
+            if chunk:
+                return chunk
+        return b''
+    return read
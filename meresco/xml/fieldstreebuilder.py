@@ -0,0 +1,85 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from meresco.xml.namespaces import namespaces as _namespaces
+from meresco.xml.pathmatcher import PathMatcher, parseFieldPath
+
+
+# Field paths relative to a record, compiled once: {name: path}, see parseFieldPath().
+class Fields(object):
+    def __init__(self, fields, namespaces=_namespaces):
+        self.names = list(fields)
+        self.fields = []
+        paths = {}
+        for index, (name, path) in enumerate(fields.items()):
+            paths[index], attribute = parseFieldPath(path, namespaces=namespaces)
+            self.fields.append((name, attribute))
+        self.matcher = PathMatcher(paths, namespaces=namespaces)
+
+    def treeBuilder(self):
+        return FieldsTreeBuilder(self)
+
+
+# TreeBuilder replacement that collects only the selected fields of a record into a
+# dict {name: [value, ...]}, returned by close(). The value of an element is its text
+# including that of its descendants, the value of an attribute its value.
+class FieldsTreeBuilder(object):
+    def __init__(self, fields):
+        self._fields = fields.fields
+        self._result = {name: [] for name in fields.names}
+        self._states = [fields.matcher.initial]
+        self._collecting = []
+
+    def start(self, tag, attrs, nsmap=None):
+        state = self._states[-1].next(tag)
+        self._states.append(state)
+        for index in state.accepts:
+            name, attribute = self._fields[index]
+            if attribute is None:
+                # The value takes its place in document order now; end() fills it in.
+                values = self._result[name]
+                values.append(None)
+                self._collecting.append((len(self._states), values, len(values) - 1, []))
+            elif attribute in attrs:
+                self._result[name].append(attrs[attribute])
+
+    def end(self, tag):
+        depth = len(self._states)
+        self._states.pop()
+        while self._collecting and self._collecting[-1][0] == depth:
+            _, values, index, parts = self._collecting.pop()
+            values[index] = ''.join(parts)
+
+    def data(self, data):
+        for _, _, _, parts in self._collecting:
+            parts.append(data)
+
+    def comment(self, comment):
+        pass
+
+    def pi(self, target, data=None):
+        pass
+
+    def close(self):
+        return self._result
@@ -23,17 +23,28 @@
 #
 ## end license ##
 
+from lxml.etree import XPath, XPathSyntaxError, XPathEvalError, _Element
+from functools import lru_cache
+from re import compile, escape
+from sys import intern
+from types import MappingProxyType
+
+from meresco.xml.lrucache import LruCache
+
+XPATH_CACHE_SIZE = 1024
+CONVERSION_CACHE_SIZE = 4096
+_CONVERSIONS = ['curieToTag', 'curieToUri', 'tagToCurie', 'uriToCurie', 'uriToTag', 'tagToUri']
+_CONVERSION_ALIASES = {'expandNsTag': 'curieToTag', 'expandNs': 'curieToTag', 'expandNsUri': 'curieToUri', 'prefixedTag': 'tagToCurie'}
+
 
 class _namespaces(dict):
     def __init__(self, *args, **kwargs):
         dict.__init__(self, *args, **kwargs)
         self._reverse = dict((v,k) for k,v in list(self.items()))
-        self._curieToTag = {}
-        self._curieToUri = {}
-        self._tagToCurie = {}
-        self._uriToCurie = {}
-        self._uriToTag = {}
-        self._tagToUri = {}
+        self._xpaths = LruCache(XPATH_CACHE_SIZE)
+        self._namespaceIndex = None
+        self.setCacheSize(CONVERSION_CACHE_SIZE)
+        self.tags = _Tags(self)
 
     def __getattr__(self, key):
         try:
@@ -49,84 +60,192 @@ class _namespaces(dict):
         return result
 
     def xpath(self, node, path):
-        return node.xpath(path, namespaces=self, smart_strings=False)
+        try:
+            compiled = self._compiled(path)
+        except XPathSyntaxError:
+            return node.xpath(path, namespaces=self, smart_strings=False)
+        return compiled(node)
 
     def xpathFirst(self, node, path):
+        # Simple child paths like 'oai:metadata/*/dc:title/text()' or 'dc:identifier/@id'
+        # walk the children lazily and stop at the first match.
+        try:
+            finder = self._xpaths[_FIRST, path]
+        except KeyError:
+            finder = self._xpaths[_FIRST, path] = self._finder(path)
+        if finder is not None and isinstance(node, _Element):
+            return finder(node)
+        # '(path)[1]' lets libxml2 stop at the first node; the same for any node-set
+        # as results are in document order. Strings and numbers come out unchanged;
+        # should the expression not compile or evaluate, path is evaluated as is.
+        key = _FIRST_XPATH, path
+        try:
+            compiled = self._xpaths[key]
+        except KeyError:
+            try:
+                compiled = XPath('(%s)[1]' % path, namespaces=self, smart_strings=False)
+            except XPathSyntaxError:
+                compiled = None
+            self._xpaths[key] = compiled
+        if compiled is not None:
+            try:
+                nodes = compiled(node)
+            except XPathEvalError:
+                self._xpaths[key] = None
+            else:
+                return nodes[0] if nodes else None
         nodes = self.xpath(node, path)
         return nodes[0] if nodes else None
 
+    def _compiled(self, path):
+        # Compiled once per namespaces object, which fixes its prefix bindings.
+        try:
+            return self._xpaths[path]
+        except KeyError:
+            pass
+        compiled = self._xpaths[path] = XPath(path, namespaces=self, smart_strings=False)
+        return compiled
+
+    def _finder(self, path):
+        steps = path.split('/')
+        last = steps.pop() if steps[-1] == 'text()' or steps[-1].startswith('@') else None
+        tags = []
+        for step in steps:
+            if not _STEP.match(step):
+                return None
+            prefix, _, local = step.rpartition(':')
+            uri = dict.get(self, prefix) if prefix else ''
+            if uri is None:
+                return None
+            tags.append('*' if step == '*' else '{%s}%s' % (uri, local))
+        tags = tuple(tags)
+        if last is None:
+            return lambda node: next(_children(node, tags), None)
+        if last == 'text()':
+            return lambda node: next((text for text in map(_firstText, _children(node, tags)) if text is not None), None)
+        if not _STEP.match(last[1:]) or last.endswith('*'):
+            return None
+        prefix, _, local = last[1:].rpartition(':')
+        uri = dict.get(self, prefix) if prefix else ''
+        if uri is None:
+            return None
+        attribute = '{%s}%s' % (uri, local) if uri else local
+        return lambda node: next((value for value in (element.get(attribute) for element in _children(node, tags)) if value is not None), None)
+
+    def xpathCacheStats(self):
+        return self._xpaths.stats()
+
+    def __reduce__(self):
+        # Caches hold bound methods; a copy starts with fresh ones.
+        return self.__class__, (dict(self),)
+
     def copyUpdate(self, d):
         return self.__class__(dict(self, **d))
 
     def select(self, *prefixes):
         return self.__class__((k, self[k]) for k in prefixes)
 
+    def setCacheSize(self, size):
+        # Puts each conversion method behind its own lru_cache of size entries on this
+        # object, emptying the caches. Functions taken from it earlier, like the
+        # module-level ones of namespaces, keep using their former cache.
+        for name in _CONVERSIONS:
+            setattr(self, name, lru_cache(maxsize=size)(getattr(self.__class__, name).__get__(self)))
+        for alias, name in _CONVERSION_ALIASES.items():
+            setattr(self, alias, getattr(self, name))
+
+    def cacheStats(self):
+        stats = {}
+        for name in _CONVERSIONS:
+            info = getattr(self, name).cache_info()
+            stats[name] = {'size': info.maxsize, 'length': info.currsize, 'hits': info.hits, 'misses': info.misses}
+        return stats
+
     def curieToTag(self, name):
-        try:
-            return self._curieToTag[name]
-        except KeyError:
-            pass
         ns, value = name.split(':', 1)
-        value = self._curieToTag[name] = '{%s}%s' % (self[ns], value)
-        return value
+        return '{%s}%s' % (self[ns], value)
 
     expandNsTag = curieToTag  # deprecated
     expandNs = curieToTag  # deprecated
 
     def curieToUri(self, name):
-        try:
-            return self._curieToUri[name]
-        except KeyError:
-            pass
         ns, value = name.split(':', 1)
-        value = self._curieToUri[name] = '%s%s' % (self[ns], value)
-        return value
+        return '%s%s' % (self[ns], value)
 
     expandNsUri = curieToUri  # deprecated
 
     def tagToCurie(self, tag):
-        try:
-            return self._tagToCurie[tag]
-        except KeyError:
-            pass
         if not (tag.startswith('{') and '}' in tag):
             raise ValueError("Expected '{some:uri}tagname', but got '%s'" % tag)
         uri, _, localtag = tag[1:].partition('}')
         prefix = self._reverse[uri]
-        value = self._tagToCurie[tag] = '%s:%s' % (prefix, localtag)
-        return value
+        return '%s:%s' % (prefix, localtag)
 
     prefixedTag = tagToCurie  # deprecated, kept for backwards compatibility
 
     def uriToCurie(self, uri):
-        try:
-            return self._uriToCurie[uri]
-        except KeyError:
-            pass
-        lhs, divider, localPart = uri.rpartition('#')
-        if not divider:
-            lhs, divider, localPart = uri.rpartition('/')
-        if not divider:
+        # The longest namespace the uri starts with, if the rest has no '/' or '#'. Only
+        # namespaces ending in a character like '/', '#' or ':' mark that boundary.
+        if self._namespaceIndex is None:
+            self._namespaceIndex = compile(_longestPrefix([namespace for namespace in self._reverse if namespace and not _NAME_CHARACTER.match(namespace[-1])]) or '(?!)')
+        match = self._namespaceIndex.match(uri)
+        if match is None and '#' not in uri and '/' not in uri:
             raise ValueError('Uri <%s> does not have a hash or slash, cannot guess namespace from this Uri.' % uri)
-        prefix = self.nsToPrefix(lhs + divider)
-        value = self._uriToCurie[uri] = None if prefix is None else prefix + ':' + localPart
-        return value
+        if match is None or _PATH_CHARACTER.search(uri, match.end()):
+            return None
+        return self._reverse[match.group()] + ':' + uri[match.end():]
 
     def uriToTag(self, uri):
-        try:
-            return self._uriToTag[uri]
-        except KeyError:
-            pass
-        value = self._uriToTag[uri] = curieToTag(uriToCurie(uri))
-        return value
+        return self.curieToTag(self.uriToCurie(uri))
 
     def tagToUri(self, tag):
-        try:
-            return self._tagToUri[tag]
-        except KeyError:
-            pass
-        value = self._tagToUri[tag] = curieToUri(tagToCurie(tag))
-        return value
+        return self.curieToUri(self.tagToCurie(tag))
+
+    def curiesToTags(self, curies):
+        curies = list(curies)
+        tags = {curie: self.curieToTag(curie) for curie in set(curies)}
+        return [tags[curie] for curie in curies]
+
+    def tagsToCuries(self, tags):
+        tags = list(tags)
+        curies = {tag: self.tagToCurie(tag) for tag in set(tags)}
+        return [curies[tag] for tag in tags]
+
+    def lookupTable(self, curies):
+        # Read-only mapping of each curie to its tag and back, for a fixed vocabulary.
+        table = {}
+        for curie in curies:
+            tag = table[curie] = self.curieToTag(curie)
+            table[tag] = curie
+        return MappingProxyType(table)
+
+    def rewriteTree(self, root, renames):
+        # Renames elements and attributes of root and its descendants in one pass;
+        # renames maps names to names, each a curie, '{uri}name' or name without namespace.
+        tags = {self._tag(old): self._tag(new) for old, new in renames.items()}
+        for element in root.iter():
+            tag = tags.get(element.tag)
+            if tag is not None:
+                element.tag = tag
+            attrib = element.attrib
+            for name in [name for name in attrib if name in tags]:
+                attrib[tags[name]] = attrib.pop(name)
+        return root
+
+    def iterCuries(self, root):
+        # Yields (element, curie) for root and its descendant elements; names without
+        # namespace are yielded as they are.
+        curies = {}
+        for element in root.iter('*'):
+            tag = element.tag
+            try:
+                curie = curies[tag]
+            except KeyError:
+                curie = curies[tag] = self.tagToCurie(tag) if tag.startswith('{') else tag
+            yield element, curie
+
+    def _tag(self, name):
+        return name if name.startswith('{') or ':' not in name else self.curieToTag(name)
 
     def nsToPrefix(self, namespace):
         return self._reverse.get(namespace)
@@ -141,6 +260,89 @@ class _namespaces(dict):
     update = _notsupported
 
 
+# Tags as attributes: tags.dc.title is '{http://purl.org/dc/elements/1.1/}title',
+# interned and created once. Other names through tags.dc['some-name'].
+class _Tags(object):
+    def __init__(self, namespaces):
+        object.__setattr__(self, '_namespaces', namespaces)
+
+    def __getattr__(self, prefix):
+        if prefix.startswith('__'):
+            raise AttributeError(prefix)
+        try:
+            uri = dict.__getitem__(self._namespaces, prefix)
+        except KeyError:
+            raise AttributeError(prefix)
+        namespaceTags = _NamespaceTags(uri)
+        object.__setattr__(self, prefix, namespaceTags)
+        return namespaceTags
+
+    def __setattr__(self, name, value):
+        raise TypeError('The tags of a namespaces object are readonly.')
+
+    __delattr__ = __setattr__
+
+
+class _NamespaceTags(object):
+    def __init__(self, uri):
+        object.__setattr__(self, '_uri', uri)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        tag = intern('{%s}%s' % (self._uri, name))
+        object.__setattr__(self, name, tag)
+        return tag
+
+    def __getitem__(self, name):
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            return self.__getattr__(name)
+
+    def __setattr__(self, name, value):
+        raise TypeError('The tags of a namespaces object are readonly.')
+
+    __delattr__ = __setattr__
+
+
+_FIRST = object()
+_FIRST_XPATH = object()
+_STEP = compile(r'(?:[^\W\d][\w.-]*:)?(?:[^\W\d][\w.-]*|\*)$')
+
+_NAME_CHARACTER = compile(r'[\w.-]')
+_PATH_CHARACTER = compile('[/#]')
+
+def _longestPrefix(strings):
+    # A trie of strings as regular expression, preferring longer ones; the ends of
+    # strings that are a prefix of others are optional groups.
+    end = '' in strings
+    rests = {}
+    for string in strings:
+        if string:
+            rests.setdefault(string[0], []).append(string[1:])
+    alternatives = [escape(character) + _longestPrefix(rest) for character, rest in sorted(rests.items())]
+    if not alternatives:
+        return ''
+    if len(alternatives) == 1 and not end:
+        return alternatives[0]
+    return ('(?:%s)?' if end else '(?:%s)') % '|'.join(alternatives)
+
+def _children(node, tags):
+    if not tags:
+        yield node
+        return
+    for child in node.iterchildren(tags[0]):
+        yield from _children(child, tags[1:])
+
+def _firstText(element):
+    if element.text:
+        return element.text
+    for child in element:
+        if child.tail:
+            return child.tail
+    return None
+
 namespaces = _namespaces(
     bibo="http://purl.org/ontology/bibo/",
     dai="info:eu-repo/dai",
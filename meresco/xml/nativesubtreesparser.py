@@ -0,0 +1,116 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from lxml.etree import XMLPullParser, iterparse, tostring
+
+from collections import deque
+from copy import deepcopy
+
+from meresco.xml.namespaces import namespaces as _namespaces
+from meresco.xml.pathmatcher import PathMatcher
+
+
+# Feedparser with the SubTreesTreeBuilder interface (feed, close, getSubtrees, isFull)
+# that leaves tag filtering and tree building to lxml. Only elements with a matching
+# tag reach Python. Matched subtrees are copied out of the document and removed from
+# it afterwards. The copied root declares all namespaces in scope, as the target
+# engine does, also those only used in content like xsi:type values; with
+# minimalNsmap=True only those its names use. With raw=True subtrees are UTF-8 bytes.
+#
+# Only usable for paths that cannot be nested in each other: all at the same depth
+# and without '//' steps; see canParse().
+class NativeSubtreesParser(object):
+    def __init__(self, paths, namespaces=_namespaces, maxSubtrees=None, raw=False, minimalNsmap=False):
+        self._matcher = PathMatcher(paths, namespaces=namespaces)
+        if self._matcher.fixedDepth() is None:
+            raise ValueError('Paths must all have the same depth and no descendant steps.')
+        self._tag = _tagFilter(self._matcher.lastSteps())
+        self._parser = XMLPullParser(events=('end',), tag=self._tag)
+        self._maxSubtrees = maxSubtrees
+        self._raw = raw
+        self._minimalNsmap = minimalNsmap
+        self._subtrees = deque()
+
+    @classmethod
+    def canParse(cls, paths, namespaces=_namespaces):
+        return PathMatcher(paths, namespaces=namespaces).fixedDepth() is not None
+
+    def feed(self, data):
+        self._parser.feed(data)
+        self._readEvents(self._parser.read_events())
+
+    def close(self):
+        self._parser.close()
+        self._readEvents(self._parser.read_events())
+
+    def parseFile(self, filename):
+        # lxml reads the file itself; subtrees are yielded as they are found.
+        for event in iterparse(filename, events=('end',), tag=self._tag):
+            self._readEvents([event])
+            yield from self.getSubtrees()
+
+    def getSubtrees(self):
+        while self._subtrees:
+            yield self._subtrees.popleft()
+
+    def isFull(self):
+        return self._maxSubtrees is not None and len(self._subtrees) >= self._maxSubtrees
+
+    def _readEvents(self, events):
+        for event, element in events:
+            accepts = self._matcher.accepts(element)
+            if not accepts:
+                continue
+            for id in accepts:
+                subtree = self._copy(element)
+                if self._raw:
+                    subtree = tostring(subtree, encoding='utf-8', xml_declaration=False)
+                self._subtrees.append((id, subtree))
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+                del parent[0]
+
+    def _copy(self, element):
+        copy = deepcopy(element)
+        copy.tail = None
+        if self._minimalNsmap:
+            return copy
+        scope = {}
+        for ancestor in reversed([element] + list(element.iterancestors())):
+            scope.update(ancestor.nsmap)
+        subtree = copy.makeelement(copy.tag, copy.attrib, nsmap=scope)
+        subtree.text = copy.text
+        subtree.extend(copy)
+        return subtree
+
+
+def _tagFilter(lastSteps):
+    tags = set()
+    for uri, local in lastSteps:
+        if uri is None and local is None:
+            return None
+        tags.add('{%s}%s' % ('*' if uri is None else uri, '*' if local is None else local))
+    return tags
@@ -23,7 +23,18 @@
 #
 ## end license ##
 
-from re import compile as _compile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from heapq import heapify, heappush, heappop
+from re import compile as _compile, UNICODE, IGNORECASE
+from time import perf_counter
+try:
+	from re import _parser as _sre_parse, _constants as _sre_constants
+except ImportError:
+	import sre_parse as _sre_parse, sre_constants as _sre_constants
+
+from meresco.xml.lrucache import LruCache
 
 def compile(rule):
 	try:
@@ -31,25 +42,365 @@ def compile(rule):
 	except Exception as e:
 		raise Exception(str(e) + ': ' + rule)
 
+MAX_SEGMENT_GROUPS = 100
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_PARALLEL_THRESHOLD = 10000
+
+# Rules are tried in order and the first match formats the result. Consecutive rules
+# are combined into one alternation (?P<_0>rule0)|(?P<_1>rule1)|..., matched in one
+# pass; the outer group that matched tells the rule and where its groups are. Rules
+# with named groups, backreferences or global flags are matched on their own.
+# Matching late in an alternation costs time quadratic in its number of groups (all
+# group marks are saved per alternative), hence the MAX_SEGMENT_GROUPS limit.
+#
+# With cacheSize results are kept in an LruCache keyed on (value, noMatchResult),
+# except those of rules with a function wrapped in impure().
+#
+# Rules that can only match values starting with certain characters (analysed from
+# the parsed regex: '^ISBN', '[a-c]x', 'urn:nbn:|doi:') are only tried for values
+# starting with one of those; other rules are always tried. Segments are built per
+# first character, when a value starting with it comes along.
+#
+# processMany() normalizes values in batches, each distinct value in a batch once;
+# with processes, batches of at least parallelThreshold distinct values are divided
+# over a process pool. Normalize, its rules and their functions must then pickle.
+#
+# With profile=True rules are matched one by one, counting per rule how often it is
+# tried and hits and the time spent matching, see profileStats() and report(). Then
+# reorder() moves frequently hitting rules forward, but only past rules that cannot
+# match the same value (first characters or literal prefixes exclude each other), so
+# the first matching rule stays the same for every value.
 class Normalize(object):
 	_default = object()
-	def __init__(self, rules, noMatchResult=_default):
+	def __init__(self, rules, noMatchResult=_default, cacheSize=None, profile=False):
 		self.rules = [(compile(rule[0]),) + rule[1:] for rule in rules]
 		self._noMatchResult = noMatchResult
+		self._index()
+		self._profile = profile
+		if profile:
+			self._process = self._profiledProcess
+			self._stats = {id(rule): [0, 0, 0.0] for rule in self.rules}
+			self._calls = 0
+			self._noMatches = 0
+		self._cacheSize = cacheSize
+		self._cache = None if cacheSize is None else LruCache(cacheSize)
+		self._impure = set(id(rule) for rule in self.rules if len(rule) > 2 and any(isinstance(function, impure) for function in rule[2]))
 
 	def process(self, value, noMatchResult=_default):
-		for rule in self.rules:
+		if self._cache is None:
+			return self._process(value, noMatchResult)[0]
+		key = (value, noMatchResult)
+		try:
+			return self._cache[key]
+		except KeyError:
+			pass
+		except TypeError:
+			return self._process(value, noMatchResult)[0]
+		result, rule = self._process(value, noMatchResult)
+		if id(rule) not in self._impure:
+			self._cache[key] = result
+		return result
+
+	def processMany(self, values, noMatchResult=_default, batchSize=DEFAULT_BATCH_SIZE, processes=None, parallelThreshold=DEFAULT_PARALLEL_THRESHOLD):
+		values = iter(values)
+		if processes is None:
+			for batch in iter(lambda: list(islice(values, batchSize)), []):
+				results = {value: self.process(value, noMatchResult) for value in dict.fromkeys(batch)}
+				yield from (results[value] for value in batch)
+			return
+		noMatchResults = () if noMatchResult is self._default else (noMatchResult,)
+		pending = deque()
+		with ProcessPoolExecutor(processes, initializer=_initWorker, initargs=(self,)) as executor:
+			for batch in iter(lambda: list(islice(values, batchSize)), []):
+				unique = list(dict.fromkeys(batch))
+				if len(unique) < parallelThreshold:
+					results, futures = [self.process(value, noMatchResult) for value in unique], None
+				else:
+					size = -(-len(unique) // processes)
+					results, futures = None, [executor.submit(_processInWorker, unique[start:start + size], noMatchResults) for start in range(0, len(unique), size)]
+				pending.append((batch, unique, results, futures))
+				if len(pending) > 1:
+					yield from _ordered(*pending.popleft())
+			while pending:
+				yield from _ordered(*pending.popleft())
+
+	def __reduce__(self):
+		noMatchResults = () if self._noMatchResult is self._default else (self._noMatchResult,)
+		return _unpickle, (self.rules, self._cacheSize, noMatchResults)
+
+	def cacheStats(self):
+		return None if self._cache is None else self._cache.stats()
+
+	def profileStats(self):
+		if not self._profile:
+			return None
+		return {
+			'calls': self._calls,
+			'noMatches': self._noMatches,
+			'rules': [dict(zip(('pattern', 'tried', 'hits', 'seconds'), [rule[0].pattern] + self._stats[id(rule)])) for rule in self.rules],
+		}
+
+	def report(self):
+		stats = self.profileStats()
+		if stats is None:
+			return 'Profiling is off.'
+		lines = ['%d calls, %d without match (%.1f%%)' % (stats['calls'], stats['noMatches'], 100.0 * stats['noMatches'] / (stats['calls'] or 1))]
+		lines.append('%10s %10s %10s  %s' % ('hits', 'tried', 'seconds', 'pattern'))
+		for rule in sorted(stats['rules'], key=lambda rule: -rule['seconds']):
+			lines.append('%(hits)10d %(tried)10d %(seconds)10.6f  %(pattern)s' % rule)
+		return '\n'.join(lines)
+
+	def reorder(self):
+		if not self._profile:
+			raise ValueError('Reordering needs the hit counts of profile=True.')
+		self.rules = _reordered(self.rules, [self._stats[id(rule)][1] for rule in self.rules])
+		self._index()
+		if self._cache is not None:
+			self._cache.clear()
+
+	def _index(self):
+		self._firstChars = [(rule, _firstChars(rule[0])) for rule in self.rules]
+		self._chars = set(char for rule, chars in self._firstChars if chars is not None for char in chars)
+		self._always = _segments([rule for rule, chars in self._firstChars if chars is None])
+		self._segmentsByChar = {}
+		self._rulesByChar = {}
+
+	def _segmentsFor(self, value):
+		char = value[:1]
+		try:
+			return self._segmentsByChar[char]
+		except KeyError:
+			pass
+		if char in self._chars:
+			segments = _segments([rule for rule, chars in self._firstChars if chars is None or char in chars])
+		else:
+			segments = self._always
+		self._segmentsByChar[char] = segments
+		return segments
+
+	def _process(self, value, noMatchResult):
+		for regex, rules in self._segmentsFor(value):
+			match = regex.match(value)
+			if match:
+				if rules is None:
+					return _format(regex.rule, match.groups()), regex.rule
+				rule, groups = rules[match.lastindex]
+				return _format(rule, match.group(*groups) if len(groups) > 1 else tuple(match.group(group) for group in groups)), rule
+		return self._noResult(noMatchResult, self._noMatchResult, value), None
+
+	def _profiledProcess(self, value, noMatchResult):
+		self._calls += 1
+		char = value[:1]
+		rules = self._rulesByChar.get(char)
+		if rules is None:
+			rules = self._rulesByChar[char] = [rule for rule, chars in self._firstChars if chars is None or char in chars]
+		for rule in rules:
+			stats = self._stats[id(rule)]
+			start = perf_counter()
 			match = rule[0].match(value)
+			stats[2] += perf_counter() - start
+			stats[0] += 1
 			if match:
-				if len(rule) > 2:
-					values = tuple(function(value) for function, value in zip(rule[2], match.groups()))
-				else:
-					values = match.groups()
-				return rule[1] % values
-		return self._noResult(noMatchResult, self._noMatchResult, value)
+				stats[1] += 1
+				return _format(rule, match.groups()), rule
+		self._noMatches += 1
+		return self._noResult(noMatchResult, self._noMatchResult, value), None
 
 	def _noResult(self, *args):
 		for a in args:
 			if a is not self._default:
 				return a
-		return args[-1]
\ No newline at end of file
+		return args[-1]
+
+class impure(object):
+	"""Marks a rule function with side effects or varying results; results of its rule are not cached."""
+	def __init__(self, function):
+		self._function = function
+
+	def __call__(self, *args):
+		return self._function(*args)
+
+def _format(rule, values):
+	if len(rule) > 2:
+		values = tuple(function(value) for function, value in zip(rule[2], values))
+	return rule[1] % values
+
+def _reordered(rules, hits):
+	# Topological order of 'rule i must stay before rule j' (i < j, not exclusive),
+	# taking the available rule with the most hits first.
+	analysed = [(_firstChars(rule[0]), _literalPrefix(rule[0])) for rule in rules]
+	successors = [[] for rule in rules]
+	predecessors = [0] * len(rules)
+	for j in range(len(rules)):
+		for i in range(j):
+			if not _exclusive(analysed[i], analysed[j]):
+				successors[i].append(j)
+				predecessors[j] += 1
+	available = [(-hits[index], index) for index in range(len(rules)) if predecessors[index] == 0]
+	heapify(available)
+	result = []
+	while available:
+		_, index = heappop(available)
+		result.append(rules[index])
+		for successor in successors[index]:
+			predecessors[successor] -= 1
+			if predecessors[successor] == 0:
+				heappush(available, (-hits[successor], successor))
+	return result
+
+def _exclusive(one, other):
+	(oneChars, onePrefix), (otherChars, otherPrefix) = one, other
+	if oneChars is not None and otherChars is not None and oneChars.isdisjoint(otherChars):
+		return True
+	return not (onePrefix.startswith(otherPrefix) or otherPrefix.startswith(onePrefix))
+
+def _unpickle(rules, cacheSize, noMatchResults):
+	return Normalize(rules, *noMatchResults, cacheSize=cacheSize)
+
+def _ordered(batch, unique, results, futures):
+	if futures is not None:
+		results = [result for future in futures for result in future.result()]
+	results = dict(zip(unique, results))
+	return (results[value] for value in batch)
+
+_worker = None
+
+def _initWorker(normalize):
+	global _worker
+	_worker = normalize
+
+def _processInWorker(values, noMatchResults):
+	return [_worker.process(value, *noMatchResults) for value in values]
+
+def _segments(rules):
+	segments = []
+	combinable = []
+	groups = 0
+	for rule in rules:
+		if _combinable(rule[0]):
+			groups += 1 + rule[0].groups
+			if groups > MAX_SEGMENT_GROUPS and combinable:
+				segments.append(_combine(combinable))
+				combinable, groups = [], 1 + rule[0].groups
+			combinable.append(rule)
+			continue
+		if combinable:
+			segments.append(_combine(combinable))
+			combinable = []
+		segments.append((_Single(rule), None))
+		groups = 0
+	if combinable:
+		segments.append(_combine(combinable))
+	return segments
+
+def _combine(rules):
+	patterns = []
+	groups = {}
+	group = 1
+	for index, rule in enumerate(rules):
+		patterns.append('(?P<_%d>%s)' % (index, rule[0].pattern))
+		groups[group] = (rule, tuple(range(group + 1, group + 1 + rule[0].groups)))
+		group += 1 + rule[0].groups
+	return _compile('|'.join(patterns)), groups
+
+def _combinable(regex):
+	return isinstance(regex.pattern, str) and \
+		not regex.groupindex and \
+		regex.flags & ~UNICODE == 0 and \
+		_NUMBERED_REFERENCE.search(regex.pattern) is None
+
+def _firstChars(regex):
+	# The characters a match must start with, or None when unknown or unlimited.
+	if not isinstance(regex.pattern, str) or regex.flags & IGNORECASE:
+		return None
+	try:
+		chars, nullable = _first(_sre_parse.parse(regex.pattern, regex.flags))
+	except Exception:
+		return None
+	return None if chars is None or nullable else frozenset(chars)
+
+def _first(items):
+	chars = set()
+	for op, argument in items:
+		if op in _ZERO_WIDTH:
+			continue
+		if op == _sre_constants.LITERAL:
+			itemChars, nullable = {chr(argument)}, False
+		elif op == _sre_constants.IN:
+			itemChars, nullable = _inChars(argument), False
+		elif op == _sre_constants.SUBPATTERN:
+			group, addFlags, delFlags, pattern = argument
+			if addFlags & IGNORECASE:
+				return None, True
+			itemChars, nullable = _first(pattern)
+		elif op == _ATOMIC_GROUP:
+			itemChars, nullable = _first(argument)
+		elif op in _REPEATS:
+			minimum, maximum, pattern = argument
+			itemChars, nullable = _first(pattern)
+			nullable = nullable or minimum == 0
+		elif op == _sre_constants.BRANCH:
+			itemChars, nullable = set(), False
+			for alternative in argument[1]:
+				alternativeChars, alternativeNullable = _first(alternative)
+				if alternativeChars is None:
+					return None, True
+				itemChars |= alternativeChars
+				nullable = nullable or alternativeNullable
+		else:
+			return None, True
+		if itemChars is None:
+			return None, True
+		chars |= itemChars
+		if not nullable:
+			return chars, False
+	return chars, True
+
+def _literalPrefix(regex):
+	# The literal text a match must start with; '' when there is none or it is unknown.
+	if not isinstance(regex.pattern, str) or regex.flags & IGNORECASE:
+		return ''
+	try:
+		return _prefix(_sre_parse.parse(regex.pattern, regex.flags))[0]
+	except Exception:
+		return ''
+
+def _prefix(items):
+	prefix = []
+	for op, argument in items:
+		if op == _sre_constants.AT:
+			continue
+		if op == _sre_constants.LITERAL:
+			prefix.append(chr(argument))
+			continue
+		if op == _sre_constants.SUBPATTERN and not argument[1] & IGNORECASE:
+			subprefix, complete = _prefix(argument[3])
+			prefix.append(subprefix)
+			if complete:
+				continue
+		return ''.join(prefix), False
+	return ''.join(prefix), True
+
+def _inChars(items):
+	chars = set()
+	for op, argument in items:
+		if op == _sre_constants.LITERAL:
+			chars.add(chr(argument))
+		elif op == _sre_constants.RANGE and argument[1] - argument[0] <= _MAX_RANGE:
+			chars.update(chr(code) for code in range(argument[0], argument[1] + 1))
+		else:
+			return None
+	return chars
+
+_ZERO_WIDTH = (_sre_constants.AT, _sre_constants.ASSERT, _sre_constants.ASSERT_NOT)
+_ATOMIC_GROUP = getattr(_sre_constants, 'ATOMIC_GROUP', None)
+_REPEATS = (_sre_constants.MAX_REPEAT, _sre_constants.MIN_REPEAT, getattr(_sre_constants, 'POSSESSIVE_REPEAT', None))
+_MAX_RANGE = 256
+
+class _Single(object):
+	def __init__(self, rule):
+		self.rule = rule
+		self.match = rule[0].match
+
+# backreferences and conditionals refer to group numbers that would shift
+_NUMBERED_REFERENCE = _compile(r'\\[1-9]|\(\?\(')
@@ -0,0 +1,170 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from lxml.etree import XMLPullParser, XMLSyntaxError, XML, tostring
+
+from collections import deque
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from mmap import mmap, ACCESS_READ
+from os import cpu_count
+from re import compile, escape
+from xml.sax.saxutils import quoteattr
+
+from meresco.xml.namespaces import namespaces as _namespaces
+from meresco.xml.parallelsaxfileparser import runInWorker
+from meresco.xml.pathmatcher import PathMatcher
+from meresco.xml.subtreestreebuilder import SimpleSaxFileParser
+from meresco.xml.utils import XML_DECLARATION, internalSubset
+
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024
+_HEAD_SIZE = 4096
+
+
+# Splits a large file with a flat structure, one parent element directly containing
+# all records, into byte ranges that start at a record start tag. Each range is
+# parsed by SimpleSaxFileParser in a separate process, within a copy of the
+# namespace context of the parent. Subtrees come out as the sequential parser yields
+# them and in the same order.
+#
+# Record start tags after the first one are found by scanning for '<prefix:record',
+# so records must all use the prefix of the first one. Such text may also occur in
+# comments, CDATA sections or nested elements; a range ending there does not parse
+# and is parsed again together with the next range. Workers only see records of
+# ranges that parse.
+class ParallelFileSplitter(object):
+    def __init__(self, filename, path, processes=None, rangeSize=DEFAULT_RANGE_SIZE, namespaces=_namespaces):
+        self._filename = filename
+        self._matcher = PathMatcher({'record': path}, namespaces=namespaces)
+        if self._matcher.fixedDepth() is None or None in self._matcher.lastSteps()[0]:
+            raise ValueError('Path must not contain descendant steps and must end with a complete tag.')
+        self._processes = processes or cpu_count()
+        self._rangeSize = rangeSize
+        self._maxInFlight = 2 * self._processes
+
+    def subtrees(self):
+        for data in self.results():
+            yield XML(data)
+
+    def results(self, worker=None):
+        envelope = self._envelope()
+        if envelope is None:
+            return
+        header, footer, path, recordStart, parentEnd, firstRecord = envelope
+        pending = deque()
+        with ProcessPoolExecutor(self._processes) as executor:
+            parse = lambda start, end: executor.submit(runInWorker, _parseRange, self._filename, start, end, header, footer, path, worker)
+            mergeStart = None
+            for byteRange in chain(self._ranges(recordStart, parentEnd, firstRecord), [None]):
+                if byteRange is not None:
+                    pending.append(byteRange + (parse(*byteRange),))
+                while pending and (byteRange is None or len(pending) >= self._maxInFlight):
+                    start, end, future = pending.popleft()
+                    if mergeStart is not None:
+                        future.cancel()
+                        start, future = mergeStart, parse(mergeStart, end)
+                    records, error = future.result()
+                    if error is None:
+                        mergeStart = None
+                        yield from records
+                    else:
+                        mergeStart = start
+            if mergeStart is not None:
+                raise ValueError('Records from byte %d on do not parse: %s' % (mergeStart, error))
+
+    def _envelope(self):
+        with open(self._filename, 'rb') as f:
+            head = b''
+            data = f.read(_HEAD_SIZE)
+            parser = XMLPullParser(events=('start',))
+            while data:
+                parser.feed(data)
+                if any(self._matcher.accepts(element) for event, element in parser.read_events()):
+                    return self._analyse(head, data)
+                head += data
+                data = f.read(_HEAD_SIZE)
+        return None
+
+    def _analyse(self, head, data):
+        # Feeding the last piece byte by byte tells where the first record start tag ends.
+        parser = XMLPullParser(events=('start',))
+        parser.feed(head)
+        for event, element in parser.read_events():
+            pass
+        for position in range(len(data)):
+            parser.feed(data[position:position + 1])
+            for event, record in parser.read_events():
+                if self._matcher.accepts(record):
+                    return self._wrapper(record, head + data[:position + 1])
+
+    def _wrapper(self, record, head):
+        parent = record.getparent()
+        if parent is None:
+            raise ValueError('Records must have a parent element.')
+        recordStart = compile(b'<' + escape(_qname(record).encode()) + b'[\\s/>]')
+        parentEnd = b'</' + _qname(parent).encode()
+        firstRecord = head.rfind(b'<' + _qname(record).encode())
+        encoding = XML_DECLARATION.match(head)
+        encoding = encoding.group(1).decode() if encoding else 'utf-8'
+        scope = {}
+        for element in reversed([parent] + list(parent.iterancestors())):
+            scope.update(element.nsmap)
+        declarations = ''.join(
+                ' xmlns%s=%s' % ('' if prefix is None else ':' + prefix, quoteattr(uri))
+                for prefix, uri in scope.items() if prefix != 'xml')
+        header = ('<?xml version="1.0" encoding="%s"?>' % encoding).encode(encoding) + internalSubset(head) + ('<%s%s>' % (_qname(parent), declarations)).encode(encoding)
+        footer = ('</%s>' % _qname(parent)).encode(encoding)
+        return header, footer, [parent.tag, record.tag], recordStart, parentEnd, firstRecord
+
+    def _ranges(self, recordStart, parentEnd, firstRecord):
+        with open(self._filename, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+            start = firstRecord
+            end = data.rfind(parentEnd)
+            if end < start:
+                raise ValueError("No end tag '%s>' after the records." % parentEnd.decode())
+            while True:
+                match = recordStart.search(data, start + self._rangeSize, end)
+                if match is None:
+                    yield start, end
+                    return
+                yield start, match.start()
+                start = match.start()
+
+
+def _parseRange(filename, start, end, header, footer, path, worker):
+    # Returns (results, None), or (None, message) when the range does not parse.
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    records = []
+    try:
+        SimpleSaxFileParser(BytesIO(header + data + footer), path, callback=lambda subtree: records.append(tostring(subtree))).start()
+    except XMLSyntaxError as e:
+        return None, str(e)
+    return (records if worker is None else [worker(record) for record in records]), None
+
+def _qname(element):
+    local = element.tag.rpartition('}')[2]
+    return local if element.prefix is None else '%s:%s' % (element.prefix, local)
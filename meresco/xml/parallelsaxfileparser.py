@@ -0,0 +1,100 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from lxml.etree import tostring
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from os import cpu_count
+from pickle import dumps
+
+from meresco.xml.subtreestreebuilder import SimpleSaxFileParser
+
+
+# Runs worker(serializedSubtree) in a process pool for every subtree that
+# SimpleSaxFileParser finds, while parsing continues in this process. callback is
+# called here with each result, in document order when ordered is True. At most
+# maxInFlight subtrees are pending; parsing waits for results beyond that.
+# The first exception raised by a worker stops parsing and is raised by start(); see
+# runInWorker() for exceptions that do not pickle.
+class ParallelSaxFileParser(object):
+    def __init__(self, stream, path, worker, callback, processes=None, executor=None, ordered=True, maxInFlight=None, **kwargs):
+        self._stream = stream
+        self._path = path
+        self._worker = worker
+        self._callback = callback
+        self._processes = processes or cpu_count()
+        self._executor = executor
+        self._ordered = ordered
+        self._maxInFlight = maxInFlight or 4 * self._processes
+        self._kwargs = kwargs
+        self._inFlight = deque()
+
+    def start(self):
+        executor = self._executor or ProcessPoolExecutor(self._processes)
+        try:
+            SimpleSaxFileParser(self._stream, self._path, callback=lambda subtree: self._submit(executor, subtree), **self._kwargs).start()
+            self._deliver(0)
+        finally:
+            for future in self._inFlight:
+                future.cancel()
+            self._inFlight.clear()
+            if self._executor is None:
+                executor.shutdown()
+
+    def _submit(self, executor, subtree):
+        self._deliver(self._maxInFlight - 1)
+        self._inFlight.append(executor.submit(runInWorker, self._worker, tostring(subtree)))
+
+    def _deliver(self, maxInFlight):
+        if self._ordered:
+            while self._inFlight and (len(self._inFlight) > maxInFlight or self._inFlight[0].done()):
+                self._callback(self._inFlight.popleft().result())
+            return
+        while len(self._inFlight) > maxInFlight:
+            wait(self._inFlight, return_when=FIRST_COMPLETED)
+            self._deliverDone()
+        self._deliverDone()
+
+    def _deliverDone(self):
+        for future in [future for future in self._inFlight if future.done()]:
+            self._inFlight.remove(future)
+            self._callback(future.result())
+
+
+class WorkerError(Exception):
+    pass
+
+
+def runInWorker(function, *args):
+    # Exceptions travel to the parent process pickled; those that do not pickle, like
+    # lxml's XMLSyntaxError, are raised as a WorkerError with their type and message.
+    try:
+        return function(*args)
+    except Exception as e:
+        try:
+            dumps(e)
+        except Exception:
+            raise WorkerError('%s: %s' % (e.__class__.__name__, e)) from None
+        raise
@@ -0,0 +1,157 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from meresco.xml.namespaces import namespaces as _namespaces
+
+
+# Compiles {id: path} into one automaton that moves along with the element stack;
+# a transition is computed once per (state, tag) and is a dict lookup afterwards.
+#
+# A path is either a list of tags from the root down, or an expression like
+# '/OAI-PMH/*/oai:record/oai:metadata/*' or '//oai:record'. Steps are '*', 'name'
+# (no namespace), 'prefix:name', 'prefix:*' or '{uri}name'; '//' matches at any depth.
+class PathMatcher(object):
+    def __init__(self, paths, namespaces=_namespaces):
+        self._paths = [(id, parsePath(path, namespaces=namespaces)) for id, path in paths.items()]
+        self._states = {}
+        self.initial = self._state(frozenset((index, 0) for index in range(len(self._paths))))
+
+    def fixedDepth(self):
+        depths = set(len(steps) for id, steps in self._paths)
+        if len(depths) == 1 and not any(descendant for id, steps in self._paths for descendant, uri, local in steps):
+            return depths.pop()
+        return None
+
+    def accepts(self, element):
+        # The ids of the paths matching an lxml element, found from its ancestors.
+        tags = [element.tag]
+        tags.extend(ancestor.tag for ancestor in element.iterancestors())
+        state = self.initial
+        for tag in reversed(tags):
+            state = state.next(tag)
+        return state.accepts
+
+    def lastSteps(self):
+        return [steps[-1][1:] for id, steps in self._paths if steps]
+
+    def _state(self, positions):
+        try:
+            return self._states[positions]
+        except KeyError:
+            pass
+        accepts = tuple(self._paths[index][0] for index, position in sorted(positions) if position == len(self._paths[index][1]))
+        state = self._states[positions] = _State(self, positions, accepts)
+        return state
+
+    def _transition(self, state, tag):
+        uri, local = _splitTag(tag)
+        positions = set()
+        for index, position in state.positions:
+            steps = self._paths[index][1]
+            if position == len(steps):
+                continue
+            descendant, stepUri, stepLocal = steps[position]
+            if descendant:
+                positions.add((index, position))
+            if (stepUri is None or stepUri == uri) and (stepLocal is None or stepLocal == local):
+                positions.add((index, position + 1))
+        return self._state(frozenset(positions))
+
+
+class _State(object):
+    __slots__ = ('_matcher', 'positions', 'accepts', '_next')
+
+    def __init__(self, matcher, positions, accepts):
+        self._matcher = matcher
+        self.positions = positions
+        self.accepts = accepts
+        self._next = {}
+
+    def next(self, tag):
+        try:
+            return self._next[tag]
+        except KeyError:
+            pass
+        state = self._next[tag] = self._matcher._transition(self, tag)
+        return state
+
+
+def parsePath(path, namespaces=_namespaces):
+    if not isinstance(path, str):
+        return tuple((False,) + _splitTag(tag) for tag in path)
+    if not path.startswith('/'):
+        raise ValueError("Expected a path starting with '/', but got '%s'" % path)
+    steps = []
+    position = 0
+    while position < len(path):
+        descendant = path.startswith('//', position)
+        position += 2 if descendant else 1
+        end = path.find('/', path.find('}', position) if path.startswith('{', position) else position)
+        if end == -1:
+            end = len(path)
+        steps.append((descendant,) + _parseStep(path[position:end], path, namespaces))
+        position = end
+    return tuple(steps)
+
+def parseFieldPath(path, namespaces=_namespaces):
+    # A path relative to a record like 'oai:header/oai:identifier', 'dc:title',
+    # '//dc:subject', '.', '@status', 'oai:header/@status' or '//@xml:lang'; returns the absolute
+    # path (the record being '/*') and the Clark name of the attribute, if any.
+    elementPath, attribute = path, None
+    last = path.rpartition('/')[2]
+    if last.startswith('@'):
+        base = path[:-len(last)]
+        elementPath = base + '*' if base.endswith('//') else base[:-1] or '.'
+        uri, local = _parseStep(last[1:], path, namespaces)
+        if local is None:
+            raise ValueError("Invalid step '%s' in path '%s'" % (last, path))
+        attribute = '{%s}%s' % (uri, local) if uri else local
+    if elementPath == '.':
+        return '/*', attribute
+    if elementPath.startswith('/') and not elementPath.startswith('//'):
+        raise ValueError("Expected a path relative to the record, but got '%s'" % path)
+    return ('/*' if elementPath.startswith('//') else '/*/') + elementPath, attribute
+
+def _parseStep(name, path, namespaces):
+    if name == '*':
+        return None, None
+    if name.startswith('{'):
+        uri, local = _splitTag(name)
+    elif ':' in name:
+        prefix, local = name.split(':', 1)
+        try:
+            uri = namespaces[prefix]
+        except KeyError:
+            raise ValueError("Unknown prefix '%s' in path '%s'" % (prefix, path))
+    else:
+        uri, local = '', name
+    if not local or '/' in local:
+        raise ValueError("Invalid step '%s' in path '%s'" % (name, path))
+    return uri, None if local == '*' else local
+
+def _splitTag(tag):
+    if tag.startswith('{'):
+        uri, _, local = tag[1:].partition('}')
+        return uri, local
+    return '', tag
@@ -1,13 +1,28 @@
-from lxml.etree import XMLParser
-
-from meresco.xml.subtreestreebuilder import SubTreesTreeBuilder
+from meresco.xml.namespaces import namespaces as _namespaces
+from meresco.xml.subtreestreebuilder import createSubtreesParser, feedInSlices, DEFAULT_MAX_SUBTREES, DEFAULT_FEED_SIZE, TARGET_ENGINE
 
 
 class PushParser(object):
-    def __init__(self, elementPath, onResultDo):
-        builder = SubTreesTreeBuilder(elementPath=elementPath, onResult=onResultDo)
-        self._parser = XMLParser(target=builder)
+    def __init__(self, elementPath, onResultDo, namespaces=_namespaces, minimalNsmap=False, maxSubtrees=DEFAULT_MAX_SUBTREES, feedSize=DEFAULT_FEED_SIZE, engine=TARGET_ENGINE, raw=False, fields=None):
+        self._parser, self._builder = createSubtreesParser(
+            paths={'record': elementPath},
+            engine=engine,
+            namespaces=namespaces,
+            minimalNsmap=minimalNsmap,
+            maxSubtrees=maxSubtrees,
+            raw=raw,
+            fields=fields)
+        self._onResultDo = onResultDo
+        self._feedSize = feedSize
 
     def feed(self, data):
-        self._parser.feed(data)
+        feedInSlices(self._parser, self._builder, data, self._processSubtrees, self._feedSize)
+        self._processSubtrees()
+
+    def close(self):
+        self._parser.close()
+        self._processSubtrees()
 
+    def _processSubtrees(self):
+        for id, subtree in self._builder.getSubtrees():
+            self._onResultDo(subtree)
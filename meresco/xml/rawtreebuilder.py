@@ -0,0 +1,168 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+# TreeBuilder replacement that serializes the events it receives straight to UTF-8
+# bytes, returned by close(), without building elements. The namespaces passed to the
+# root start() are declared on it, like TreeBuilder does; a namespace not declared at
+# all gets a generated prefix.
+class RawTreeBuilder(object):
+    def __init__(self, rootScope=None):
+        self._parts = []
+        self._scopes = [rootScope or _rootScope()]
+        self._qnames = []
+        self._startOpen = False
+
+    def start(self, tag, attrs, nsmap=None):
+        if self._startOpen:
+            self._parts.append('>')
+        scope = self._scopes[-1]
+        declarations = {}
+        if nsmap:
+            declarations.update((prefix or None, uri) for prefix, uri in nsmap.items())
+            scope = scope.declare(declarations)
+        qname, scope = scope.qname(tag, False, declarations)
+        attributes = []
+        for name, value in attrs.items():
+            name, scope = scope.qname(name, True, declarations)
+            attributes.append((name, value))
+        parts = self._parts
+        parts.append('<' + qname)
+        for prefix, uri in declarations.items():
+            parts.extend((' xmlns="' if prefix is None else ' xmlns:%s="' % prefix, _escapeAttribute(uri), '"'))
+        for name, value in attributes:
+            parts.extend((' ', name, '="', _escapeAttribute(value), '"'))
+        self._scopes.append(scope)
+        self._qnames.append(qname)
+        self._startOpen = True
+
+    def end(self, tag):
+        self._scopes.pop()
+        qname = self._qnames.pop()
+        if self._startOpen:
+            self._parts.append('/>')
+            self._startOpen = False
+        else:
+            self._parts.extend(('</', qname, '>'))
+
+    def data(self, data):
+        if data:
+            self._content(_escapeText(data))
+
+    def comment(self, comment):
+        self._content('<!--%s-->' % comment)
+
+    def pi(self, target, data=None):
+        self._content('<?%s?>' % target if data is None else '<?%s %s?>' % (target, data))
+
+    def close(self):
+        return ''.join(self._parts).encode('utf-8')
+
+    def _content(self, content):
+        if self._startOpen:
+            self._parts.append('>')
+            self._startOpen = False
+        self._parts.append(content)
+
+
+def rawTreeBuilderFactory():
+    # The builders of one factory share a root scope, so the scopes and names cached
+    # for one parser are released with it.
+    rootScope = _rootScope()
+    return lambda: RawTreeBuilder(rootScope)
+
+
+class _Scope(object):
+    # Scopes are shared: a scope keeps the scopes derived from it, and the qualified
+    # names resolved in it, so records with the same namespace context reuse them.
+    __slots__ = ('prefixes', 'uris', '_children', '_elementNames', '_attributeNames')
+
+    def __init__(self, prefixes):
+        self.prefixes = prefixes
+        self.uris = {}
+        for prefix, uri in prefixes.items():
+            if prefix is not None or uri not in self.uris:
+                self.uris[uri] = prefix
+        self._children = {}
+        self._elementNames = {}
+        self._attributeNames = {}
+
+    def declare(self, declarations):
+        key = tuple(declarations.items())
+        try:
+            return self._children[key]
+        except KeyError:
+            pass
+        prefixes = dict(self.prefixes)
+        prefixes.update(declarations)
+        scope = self._children[key] = _Scope(prefixes)
+        return scope
+
+    def qname(self, name, isAttribute, declarations):
+        # Returns the qualified name and the scope, extended when a declaration is needed.
+        names = self._attributeNames if isAttribute else self._elementNames
+        try:
+            return names[name], self
+        except KeyError:
+            pass
+        if name[0] != '{':
+            if isAttribute or not self.prefixes.get(None):
+                names[name] = name
+                return name, self
+            declarations[None] = ''
+            return name, self.declare({None: ''})
+        uri, local = name[1:].split('}', 1)
+        if not isAttribute and self.prefixes.get(None) == uri:
+            names[name] = local
+            return local, self
+        prefix = self.uris.get(uri)
+        if prefix is None:
+            prefix = next('ns%d' % n for n in range(len(self.prefixes) + 1) if 'ns%d' % n not in self.prefixes)
+            declarations[prefix] = uri
+            return '%s:%s' % (prefix, local), self.declare({prefix: uri})
+        qname = names[name] = '%s:%s' % (prefix, local)
+        return qname, self
+
+def _rootScope():
+    return _Scope({'xml': 'http://www.w3.org/XML/1998/namespace'})
+
+def _escapeText(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    if '\r' in text:
+        text = text.replace('\r', '&#13;')
+    return text
+
+def _escapeAttribute(value):
+    value = _escapeText(value)
+    if '"' in value:
+        value = value.replace('"', '&quot;')
+    if '\n' in value:
+        value = value.replace('\n', '&#10;')
+    if '\t' in value:
+        value = value.replace('\t', '&#9;')
+    return value
@@ -0,0 +1,223 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from json import dumps, loads
+from mmap import mmap, ACCESS_READ
+from os.path import getsize
+from re import compile
+from struct import Struct, error as StructError
+from xml.parsers.expat import ParserCreate
+from xml.sax.saxutils import quoteattr
+
+from meresco.xml.namespaces import namespaces as _namespaces
+from meresco.xml.subtreestreebuilder import SubTreesTreeBuilder, createSubtreesParser, DEFAULT_FEED_SIZE
+from meresco.xml.utils import XML_DECLARATION, internalSubset
+
+
+# One streaming pass over a file records where each matching subtree starts and ends,
+# and which namespaces are in scope around it, in a sidecar index file:
+#
+#   magic | header length | JSON header | entries (offset, length, context) | identifiers
+#
+# Entries have a fixed size, so RecordIndex.record(n) seeks straight to the entry and
+# to the record, and parses only that fragment within a copy of its namespace context.
+#
+# Offsets are in bytes of the file as it is, so files must use an ASCII compatible
+# encoding (UTF-8, ISO-8859-x, ...). An internal DTD subset is kept in the header and
+# declared around every record, so its entities can be used in records; a record
+# must not start or end inside an entity's replacement text.
+def buildRecordIndex(filename, path, identifier=None, indexFilename=None, namespaces=_namespaces, feedSize=DEFAULT_FEED_SIZE):
+    entries = bytearray()
+    contexts = {}
+    identifiers = []
+    with open(filename, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+        def onRecord(start, end, scope, subtree):
+            startTagEnd = _TAG_END.match(data, start).end()
+            end = startTagEnd if data[startTagEnd - 2:startTagEnd] == b'/>' else _TAG_END.match(data, end).end()
+            entries.extend(_ENTRY.pack(start, end - start, contexts.setdefault(scope, len(contexts))))
+            if identifier is not None:
+                identifiers.append(identifier(subtree))
+        target = _ExpatTarget(SubTreesTreeBuilder(paths={'record': path}, namespaces=namespaces), onRecord)
+        for position in range(0, len(data), feedSize):
+            target.feed(data[position:position + feedSize])
+        target.close()
+        encoding = XML_DECLARATION.match(data[:1024])
+        encoding = encoding.group(1).decode() if encoding else 'utf-8'
+        doctype = internalSubset(data).decode(encoding)
+        size = len(data)
+    count = len(entries) // _ENTRY.size
+    header = dumps({
+        'encoding': encoding,
+        'doctype': doctype,
+        'size': size,
+        'count': count,
+        'contexts': [dict(scope) for scope in sorted(contexts, key=contexts.get)],
+        'identifiers': identifier is not None,
+    }).encode()
+    with open(indexFilename or filename + INDEX_EXTENSION, 'wb') as f:
+        f.write(_MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+        f.write(entries)
+        if identifier is not None:
+            f.write(dumps(identifiers).encode())
+    return count
+
+
+class RecordIndex(object):
+    def __init__(self, filename, indexFilename=None, namespaces=_namespaces):
+        self._filename = filename
+        self._namespaces = namespaces
+        self._index = open(indexFilename or filename + INDEX_EXTENSION, 'rb')
+        try:
+            header = self._readHeader()
+        except (OSError, ValueError, KeyError, StructError):
+            self._index.close()
+            raise
+        self._count = header['count']
+        self._encoding = header['encoding']
+        self._doctype = header['doctype']
+        self._hasIdentifiers = header['identifiers']
+        self._envelopes = [self._envelope(scope) for scope in header['contexts']]
+        self._identifiers = None
+        self._data = open(filename, 'rb')
+
+    def __len__(self):
+        return self._count
+
+    def record(self, n):
+        return self._parse(*self._read(n))
+
+    def recordData(self, n):
+        return self._read(n)[0]
+
+    def numbers(self, identifier):
+        if not self._hasIdentifiers:
+            raise ValueError('Index was built without identifiers.')
+        if self._identifiers is None:
+            self._index.seek(self._entries + self._count * _ENTRY.size)
+            self._identifiers = {}
+            for n, value in enumerate(loads(self._index.read())):
+                self._identifiers.setdefault(value, []).append(n)
+        return self._identifiers.get(identifier, [])
+
+    def byIdentifier(self, identifier):
+        return [self.record(n) for n in self.numbers(identifier)]
+
+    def close(self):
+        self._index.close()
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _readHeader(self):
+        if self._index.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError('Not a record index.')
+        headerLength, = _HEADER_LENGTH.unpack(self._index.read(_HEADER_LENGTH.size))
+        header = loads(self._index.read(headerLength))
+        if header['size'] != getsize(self._filename):
+            raise ValueError("Index does not match '%s'; it must be rebuilt." % self._filename)
+        self._entries = self._index.tell()
+        return header
+
+    def _read(self, n):
+        if not 0 <= n < self._count:
+            raise IndexError('Record %s out of range.' % n)
+        self._index.seek(self._entries + n * _ENTRY.size)
+        offset, length, context = _ENTRY.unpack(self._index.read(_ENTRY.size))
+        self._data.seek(offset)
+        return self._data.read(length), context
+
+    def _parse(self, data, context):
+        header, footer = self._envelopes[context]
+        parser, builder = createSubtreesParser(paths={'record': '/*/*'}, namespaces=self._namespaces)
+        parser.feed(header + data + footer)
+        parser.close()
+        return next(builder.getSubtrees())[1]
+
+    def _envelope(self, scope):
+        declarations = ''.join(
+                ' xmlns%s=%s' % (':' + prefix if prefix else '', quoteattr(uri))
+                for prefix, uri in scope.items())
+        return (
+            ('<?xml version="1.0" encoding="%s"?>%s<envelope%s>' % (self._encoding, self._doctype, declarations)).encode(self._encoding),
+            b'</envelope>')
+
+
+class _ExpatTarget(object):
+    # Drives a SubTreesTreeBuilder from expat, which tells the byte offset of each event.
+    def __init__(self, builder, onRecord):
+        self._builder = builder
+        self._onRecord = onRecord
+        self._parser = ParserCreate(namespace_separator='}')
+        self._parser.buffer_text = True
+        self._parser.StartNamespaceDeclHandler = self._startNamespace
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = builder.data
+        self._parser.CommentHandler = builder.comment
+        self._parser.ProcessingInstructionHandler = builder.pi
+        self._nsmap = {}
+        self._stack = [((), 0, ())]
+
+    def feed(self, data):
+        self._parser.Parse(data, False)
+
+    def close(self):
+        self._parser.Parse(b'', True)
+        self._builder.close()
+
+    def _startNamespace(self, prefix, uri):
+        self._nsmap[prefix] = uri or ''
+
+    def _start(self, name, attrs):
+        scope = parentScope = self._stack[-1][0]
+        if self._nsmap:
+            scope = dict(scope)
+            scope.update((prefix or '', uri) for prefix, uri in self._nsmap.items())
+            scope = tuple(sorted(scope.items()))
+        self._stack.append((scope, self._parser.CurrentByteIndex, parentScope))
+        self._builder.start(_tag(name), {_tag(key): value for key, value in attrs.items()}, self._nsmap)
+        self._nsmap = {}
+
+    def _end(self, name):
+        end = self._parser.CurrentByteIndex
+        scope, start, parentScope = self._stack.pop()
+        self._builder.end(_tag(name))
+        for id, subtree in self._builder.getSubtrees():
+            self._onRecord(start, end, parentScope, subtree)
+
+
+def _tag(name):
+    return '{' + name if '}' in name else name
+
+INDEX_EXTENSION = '.index'
+
+_MAGIC = b'MXRIDX2\n'
+_HEADER_LENGTH = Struct('>I')
+_ENTRY = Struct('>QII')
+# From the '<' of a tag to just after its '>', skipping '>' in attribute values.
+_TAG_END = compile(b'''(?:[^>"']|"[^"]*"|'[^']*')*>''')
@@ -24,107 +24,272 @@
 
 from lxml.etree import TreeBuilder, XMLParser, parse, tostring
 
-from os.path import abspath, dirname, join
+from collections import deque
+from mmap import mmap, ACCESS_READ
+from os.path import abspath, dirname, getsize, join
+
+from meresco.xml.fieldstreebuilder import Fields
+from meresco.xml.namespaces import namespaces as _namespaces
+from meresco.xml.nativesubtreesparser import NativeSubtreesParser
+from meresco.xml.pathmatcher import PathMatcher
+from meresco.xml.rawtreebuilder import rawTreeBuilderFactory
 
 
 class SubTreesTreeBuilder(object):
-    def __init__(self, buildFor=None, elementPath=None, treeBuilderFactory=TreeBuilder, onResult=None):
+    def __init__(self, buildFor=None, elementPath=None, paths=None, treeBuilderFactory=TreeBuilder, onResult=None, namespaces=_namespaces, minimalNsmap=False, maxSubtrees=None, raw=False, fields=None):
         if elementPath:
-            buildFor = {elementPath[-1]: lambda stack: [d['tag'] for d in stack] == elementPath}
+            paths = dict(paths or {})
+            paths[elementPath if isinstance(elementPath, str) else elementPath[-1]] = elementPath
+        self._matcher = PathMatcher(paths, namespaces=namespaces) if paths else None
         self._buildFor = buildFor
-        self._treeBuilderFactory = treeBuilderFactory
+        if raw and fields:
+            raise ValueError('Choose either raw or fields.')
+        if fields:
+            treeBuilderFactory = Fields(fields, namespaces=namespaces).treeBuilder
+        self._treeBuilderFactory = rawTreeBuilderFactory() if raw else treeBuilderFactory
+        self._minimalNsmap = minimalNsmap
         self._onResult = onResult
-        self._subtrees = []
-        self._currentTreeBuilders = {}
+        self._maxSubtrees = maxSubtrees
+        self._subtrees = deque()
+        # (depth, id, builder) in order of their start; nested matches each get one.
+        self._currentTreeBuilders = []
         self._stack = []
+        self._root = {'scope': {}, 'state': self._matcher.initial if self._matcher else None}
 
     def buildFor(self):
-        return [id for (id, f) in list(self._buildFor.items()) if f(self._stack)]
-
-    def _nsmapFullStack(self):
-        enrichedNSmap = {}
-        for node in self._stack:
-            enrichedNSmap.update(node['nsmap'])
-        return enrichedNSmap
+        ids = list(self._stack[-1]['state'].accepts) if self._matcher else []
+        if self._buildFor:
+            ids.extend(id for (id, f) in list(self._buildFor.items()) if f(self._stack))
+        return ids
 
     def getSubtrees(self):
         # *Must* be called after XMLParser.close() too!
         while self._subtrees:
-            yield self._subtrees.pop(0)
+            yield self._subtrees.popleft()
+
+    def isFull(self):
+        # Backpressure signal; the parser cannot be paused halfway a feed(), so feeding
+        # in limited slices and draining getSubtrees() when full keeps the queue bounded.
+        return self._maxSubtrees is not None and len(self._subtrees) >= self._maxSubtrees
 
     # etree TreeBuilder interface
     def start(self, tag, attrs, nsmap=None):
-        if nsmap is None:
+        parent = self._stack[-1] if self._stack else self._root
+        scope = parent['scope']
+        if nsmap:
+            if '' in nsmap:
+                # newer lxml versions report the default namespace with prefix ''
+                nsmap = {prefix or None: uri for prefix, uri in nsmap.items()}
+            scope = dict(scope)
+            scope.update(nsmap)
+        else:
             nsmap = {}
-        self._stack.append({'tag': tag, 'attrs': attrs, 'nsmap': nsmap})
+        state = parent['state'].next(tag) if self._matcher else None
+        self._stack.append({'tag': tag, 'attrs': attrs, 'nsmap': nsmap, 'scope': scope, 'state': state})
 
-        for tb in list(self._currentTreeBuilders.values()):
+        for _, _, tb in self._currentTreeBuilders:
             tb.start(tag, attrs, nsmap)
 
-        builders = self.buildFor()
+        builders = state.accepts if self._buildFor is None else self.buildFor()
         if builders:
             for id in builders:
                 builder = self._treeBuilderFactory()
-                namespaces = self._nsmapFullStack()
-                builder.start(tag, attrs, namespaces)
-                self._currentTreeBuilders[id] = builder
+                if self._minimalNsmap:
+                    builder = _MinimalNsmapTreeBuilder(builder, self._stack)
+                    builder.start(tag, attrs, nsmap)
+                else:
+                    builder.start(tag, attrs, scope)
+                self._currentTreeBuilders.append((len(self._stack), id, builder))
 
     def comment(self, comment):
-        for tb in list(self._currentTreeBuilders.values()):
+        for _, _, tb in self._currentTreeBuilders:
             tb.comment(comment)
 
     def data(self, data):
-        for tb in list(self._currentTreeBuilders.values()):
+        for _, _, tb in self._currentTreeBuilders:
             tb.data(data)
 
     def end(self, tag):
-        builders = self.buildFor()
+        depth = len(self._stack)
         assert self._stack.pop()['tag'] == tag, 'Stack and parser out-of-sync.'
 
         if not self._currentTreeBuilders:
             return
 
-        for tb in list(self._currentTreeBuilders.values()):
+        for _, _, tb in self._currentTreeBuilders:
             tb.end(tag)
 
-        if builders:
-            for id in builders:
-                root = self._currentTreeBuilders[id].close()
-                if self._onResult:
-                    self._onResult(root)
-                self._subtrees.append((id, root))
-                del self._currentTreeBuilders[id]
+        first = len(self._currentTreeBuilders)
+        while first and self._currentTreeBuilders[first - 1][0] == depth:
+            first -= 1
+        finished = self._currentTreeBuilders[first:]
+        del self._currentTreeBuilders[first:]
+        for _, id, tb in finished:
+            root = tb.close()
+            self._subtrees.append((id, root))
+            if self._onResult:
+                self._onResult(root)
 
     def pi(self, target, data):
-        for tb in list(self._currentTreeBuilders.values()):
+        for _, _, tb in self._currentTreeBuilders:
             tb.pi(target, data)
 
     def close(self):
-        assert not self._currentTreeBuilders, 'TreeBuilder(s) still present on close.'
+        # Builders left open mean the document is unfinished; lxml calls close() and
+        # then raises its XMLSyntaxError, which an exception here would hide.
+        del self._currentTreeBuilders[:]
+
+
+class _MinimalNsmapTreeBuilder(object):
+    # Declares a namespace inherited from outside the subtree only on the element(s)
+    # that use it; declarations made within the subtree itself are kept as they are.
+    # Note that prefixes only used in content (like xsi:type values) are not detected.
+    def __init__(self, builder, stack):
+        self._builder = builder
+        self._stack = stack
+        self._declared = [{}]
+
+    def start(self, tag, attrs, nsmap=None):
+        declared = self._declared[-1]
+        if nsmap:
+            declared = dict(declared)
+            declared.update(nsmap)
+        scope = self._stack[-1]['scope']
+        needed = {}
+        self._declare(needed, declared, scope, tag, False)
+        for name in attrs:
+            self._declare(needed, declared, scope, name, True)
+        if needed:
+            nsmap = dict(nsmap or {})
+            nsmap.update(needed)
+            declared = dict(declared)
+            declared.update(needed)
+        self._declared.append(declared)
+        self._builder.start(tag, attrs, nsmap)
+
+    def _declare(self, needed, declared, scope, name, isAttribute):
+        if name[0] != '{':
+            return
+        uri = name[1:name.index('}')]
+        if uri == _XML_NAMESPACE:
+            return
+        for prefixes in (declared, needed):
+            for prefix, value in prefixes.items():
+                if value == uri and (prefix is not None or not isAttribute):
+                    return
+        for prefix, value in scope.items():
+            if value == uri and (prefix is not None or not isAttribute):
+                needed[prefix] = uri
+                return
+
+    def end(self, tag):
+        self._declared.pop()
+        return self._builder.end(tag)
+
+    def data(self, data):
+        self._builder.data(data)
+
+    def comment(self, comment):
+        self._builder.comment(comment)
+
+    def pi(self, target, data):
+        self._builder.pi(target, data)
+
+    def close(self):
+        return self._builder.close()
+
+_XML_NAMESPACE = 'http://www.w3.org/XML/1998/namespace'
+
+DEFAULT_MAX_SUBTREES = 1000
+DEFAULT_FEED_SIZE = 64 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+TARGET_ENGINE = 'target'
+NATIVE_ENGINE = 'native'
+AUTO_ENGINE = 'auto'
+
+MMAP_INPUT = 'mmap'
+NATIVE_INPUT = 'native'
+
+def createSubtreesParser(paths, engine=TARGET_ENGINE, namespaces=_namespaces, minimalNsmap=False, maxSubtrees=None, onResult=None, raw=False, fields=None):
+    # Returns a (parser, builder) pair: feed() and close() the parser, take results
+    # from builder.getSubtrees(). The auto engine uses the native engine when the
+    # paths allow it and minimalNsmap is not asked for: the native engine declares
+    # the namespaces a subtree uses on its root, not on the elements using them.
+    # With raw=True subtrees are UTF-8 bytes instead of elements; with fields
+    # {name: path} they are dicts of field values, which only the target engine does.
+    if fields and engine == NATIVE_ENGINE:
+        raise ValueError('Fields are not supported by the native engine.')
+    if engine == NATIVE_ENGINE or (engine == AUTO_ENGINE and not fields and not minimalNsmap and NativeSubtreesParser.canParse(paths, namespaces=namespaces)):
+        parser = NativeSubtreesParser(paths, namespaces=namespaces, maxSubtrees=maxSubtrees, raw=raw, minimalNsmap=minimalNsmap)
+        return parser, parser
+    if engine not in (TARGET_ENGINE, AUTO_ENGINE):
+        raise ValueError("Unknown engine '%s'" % engine)
+    builder = SubTreesTreeBuilder(paths=paths, namespaces=namespaces, minimalNsmap=minimalNsmap, maxSubtrees=maxSubtrees, onResult=onResult, raw=raw, fields=fields)
+    return XMLParser(target=builder), builder
 
 
 class SimpleSaxFileParser(object):
-    def __init__(self, stream, path, callback):
+    # stream is a file object or the name of a file. A file is memory-mapped and fed
+    # feedSize bytes at a time (fileInput='mmap'), or read by lxml itself ('native').
+    def __init__(self, stream, path, callback, minimalNsmap=False, maxSubtrees=DEFAULT_MAX_SUBTREES, feedSize=DEFAULT_FEED_SIZE, engine=TARGET_ENGINE, chunkSize=DEFAULT_CHUNK_SIZE, fileInput=MMAP_INPUT):
         self._stream = stream
         self._path = path
         self._callback = callback
+        self._minimalNsmap = minimalNsmap
+        self._maxSubtrees = maxSubtrees
+        self._feedSize = feedSize
+        self._engine = engine
+        self._chunkSize = chunkSize
+        self._fileInput = fileInput
 
     def start(self):
-        def isPath(stack):
-            return [d['tag'] for d in stack] == self._path
-        builder = SubTreesTreeBuilder(buildFor={
-            'simple': isPath,
-        })
-        def processSubtrees():
-            for id, subtree in builder.getSubtrees():
-                self._callback(subtree)
-        parser = XMLParser(target=builder)
+        if not isinstance(self._stream, str):
+            self._parse(self._read())
+        elif self._fileInput == NATIVE_INPUT:
+            self._parseFile()
+        elif getsize(self._stream) == 0:
+            self._parse([])
+        else:
+            with open(self._stream, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+                # lxml only accepts bytes; feedInSlices passes small data on unsliced
+                self._parse([data if len(data) > self._feedSize else data[:]])
 
-        data = self._stream.read(4096)
+    def _read(self):
+        data = self._stream.read(self._chunkSize)
         while data:
-            parser.feed(data)
+            yield data
+            data = self._stream.read(self._chunkSize)
+
+    def _parse(self, chunks):
+        parser, builder = self._createParser()
+        processSubtrees = lambda: self._processSubtrees(builder)
+        for data in chunks:
+            feedInSlices(parser, builder, data, processSubtrees, self._feedSize)
             processSubtrees()
-            data = self._stream.read(4096)
         parser.close()
         processSubtrees()
 
+    def _parseFile(self):
+        parser, builder = self._createParser(onResult=lambda subtree: self._processSubtrees(builder))
+        if parser is builder:
+            for id, subtree in parser.parseFile(self._stream):
+                self._callback(subtree)
+            return
+        parse(self._stream, parser)
+        self._processSubtrees(builder)
+
+    def _createParser(self, onResult=None):
+        return createSubtreesParser(paths={'simple': self._path}, engine=self._engine, minimalNsmap=self._minimalNsmap, maxSubtrees=self._maxSubtrees, onResult=onResult)
+
+    def _processSubtrees(self, builder):
+        for id, subtree in builder.getSubtrees():
+            self._callback(subtree)
+
+
+def feedInSlices(parser, builder, data, processSubtrees, feedSize=DEFAULT_FEED_SIZE):
+    for position in range(0, len(data), feedSize):
+        parser.feed(data[position:position + feedSize] if len(data) > feedSize else data)
+        if builder.isFull():
+            processSubtrees()
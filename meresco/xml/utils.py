@@ -23,9 +23,44 @@
 #
 ## end license ##
 
+from re import compile
+from xml.parsers.expat import ParserCreate
+
 from lxml.etree import Element
 from meresco.xml.namespaces import namespaces as _namespaces
 
+# Matches an XML declaration in bytes; group 1 is the declared encoding.
+XML_DECLARATION = compile(b'<\\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)["\']')
+
+def internalSubset(data):
+    # The document type declaration of the XML document in bytes data when it has an
+    # internal subset, otherwise b''. Only the prolog is parsed.
+    parser = ParserCreate()
+    declaration = []
+    def startDoctype(name, systemId, publicId, hasInternalSubset):
+        declaration.append(hasInternalSubset)
+    def endDoctype():
+        # Expat reports the end at the closing '>' of the declaration.
+        if declaration[0]:
+            end = parser.CurrentByteIndex + 1
+            declaration.append(data[data.find(b'<!DOCTYPE', 0, end):end])
+    def start(name, attrs):
+        raise _PrologEnd()
+    parser.StartDoctypeDeclHandler = startDoctype
+    parser.EndDoctypeDeclHandler = endDoctype
+    parser.StartElementHandler = start
+    try:
+        for position in range(0, len(data), _PROLOG_CHUNK_SIZE):
+            parser.Parse(data[position:position + _PROLOG_CHUNK_SIZE], False)
+    except _PrologEnd:
+        pass
+    return declaration[1] if len(declaration) > 1 else b''
+
+class _PrologEnd(Exception):
+    pass
+
+_PROLOG_CHUNK_SIZE = 64 * 1024
+
 def sortRootTagAttrib(xmlString):
     root, remainder = xmlString.split(">", 1)
     rootAttribs = root[root.find(' '):].strip()
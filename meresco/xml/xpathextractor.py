@@ -0,0 +1,138 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from lxml.etree import XPath
+from re import compile
+
+from meresco.xml.namespaces import namespaces as _namespaces
+from meresco.xml.pathmatcher import PathMatcher, parseFieldPath, parsePath
+
+
+# Evaluates {name: xpath} relative to a record with one walk over it, returning
+# {name: result} as namespaces.xpath() would. Paths of child and descendant steps,
+# possibly ending in 'text()' or '@attr', share one automaton; the walk skips
+# subtrees where none of them can match. Other paths are compiled XPaths.
+class XPathExtractor(object):
+    def __init__(self, paths, namespaces=_namespaces):
+        self.names = list(paths)
+        self._fields = []
+        self._xpaths = []
+        simplePaths = {}
+        for name, path in paths.items():
+            simplePath = _simplePath(path)
+            if simplePath is not None:
+                try:
+                    absolutePath, attribute = parseFieldPath(simplePath, namespaces=namespaces)
+                    parsePath(absolutePath, namespaces=namespaces)
+                except ValueError:
+                    simplePath = None
+            if simplePath is None:
+                self._xpaths.append((name, XPath(path, namespaces=namespaces, smart_strings=False)))
+                continue
+            simplePaths[len(self._fields)] = absolutePath
+            self._fields.append((name, _TEXT if path.endswith('text()') else attribute))
+        self._matcher = PathMatcher(simplePaths, namespaces=namespaces) if simplePaths else None
+        self._plans = {}
+
+    def extract(self, node):
+        result = {name: [] for name in self.names}
+        if self._matcher is not None:
+            self._walk([node], self._matcher.initial, None, result)
+        for name, xpath in self._xpaths:
+            result[name] = xpath(node)
+        return result
+
+    def extractFirst(self, node):
+        return {name: values[0] if values else None for name, values in self.extract(node).items()}
+
+    def _walk(self, elements, state, texts, result):
+        # Collects from elements, the children of an element in state whose text
+        # nodes go to the lists in texts.
+        plans = self._plans
+        for element in elements:
+            tag = element.tag
+            if tag.__class__ is str:
+                elementState = state.next(tag)
+                try:
+                    plan = plans[elementState]
+                except KeyError:
+                    plan = self._plan(elementState)
+                if plan is not None:
+                    names, textNames, attributes, descend = plan
+                    for name in names:
+                        result[name].append(element)
+                    for name, attribute in attributes:
+                        value = element.get(attribute)
+                        if value is not None:
+                            result[name].append(value)
+                    elementTexts = None
+                    if textNames:
+                        elementTexts = [result[name] for name in textNames]
+                        text = element.text
+                        if text:
+                            for values in elementTexts:
+                                values.append(text)
+                    if descend or elementTexts and len(element):
+                        self._walk(element, elementState, elementTexts, result)
+            if texts:
+                tail = element.tail
+                if tail:
+                    for values in texts:
+                        values.append(tail)
+
+    def _plan(self, state):
+        # What to collect at an element in this state, and whether its children can
+        # match at all: a state has one position for each path it accepts.
+        elements, texts, attributes = [], [], []
+        for index in state.accepts:
+            name, kind = self._fields[index]
+            if kind is None:
+                elements.append(name)
+            elif kind is _TEXT:
+                texts.append(name)
+            else:
+                attributes.append((name, kind))
+        plan = self._plans[state] = (elements, texts, attributes, len(state.positions) > len(state.accepts)) if state.positions else None
+        return plan
+
+
+_TEXT = object()
+_NAME = r'[^\W\d][\w.-]*'
+_STEP = r'(?:(?:%s:)?%s|(?:%s:)?\*)' % (_NAME, _NAME, _NAME)
+_ELEMENTS = r'(?:\.//?)?%s(?://?%s)*' % (_STEP, _STEP)
+_SIMPLE = compile(r'(?:(?:\.|%s)(?:/text\(\)|/@(?:%s:)?%s)?|text\(\)|@(?:%s:)?%s)$' % (_ELEMENTS, _NAME, _NAME, _NAME, _NAME))
+
+def _simplePath(path):
+    # The path for parseFieldPath(), or None when the path is not that simple.
+    if not _SIMPLE.match(path):
+        return None
+    if path == 'text()':
+        return '.'
+    if path.endswith('/text()'):
+        path = path[:-len('/text()')]
+    if path.startswith('.//'):
+        return path[1:]
+    if path.startswith('./'):
+        return path[2:]
+    return path
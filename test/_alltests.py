@@ -35,11 +35,21 @@ sysPath.insert(0,'..')                            #DO_NOT_DISTRIBUTE
 
 import unittest
 
+from asyncpushparsertest import AsyncPushParserTest
+from fieldstreebuildertest import FieldsTreeBuilderTest
+from lrucachetest import LruCacheTest
 from namespacestest import NamespacesTest
+from nativesubtreesparsertest import NativeSubtreesParserTest
 from normalizetest import NormalizeTest
+from parallelfilesplittertest import ParallelFileSplitterTest
+from parallelsaxfileparsertest import ParallelSaxFileParserTest
+from pathmatchertest import PathMatcherTest
 from pushparsertest import PushParserTest
+from rawtreebuildertest import RawTreeBuilderTest
+from recordindextest import RecordIndexTest
 from subtreestreebuildertest import SubTreesTreeBuilderTest
 from utilstest import UtilsTest
+from xpathextractortest import XPathExtractorTest
 
 if __name__ == '__main__':
     unittest.main()
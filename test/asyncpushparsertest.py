@@ -0,0 +1,135 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from asyncio import run, StreamReader
+from lxml.etree import tostring, XMLSyntaxError
+
+from meresco.xml import namespaces
+from meresco.xml.asyncpushparser import AsyncPushParser
+
+
+class AsyncPushParserTest(TestCase):
+    def testAsyncIterable(self):
+        async def chunks():
+            yield b'<XML><records><record>'
+            yield b''
+            yield b'aap</record><record>noot</re'
+            yield b'cord></records></XML>'
+        self.assertEqual([b'<record>aap</record>', b'<record>noot</record>'], run(self._records(AsyncPushParser(chunks(), elementPath=['XML', 'records', 'record']))))
+
+    def testStreamReader(self):
+        async def test():
+            reader = StreamReader()
+            reader.feed_data(('<oai:OAI-PMH %(xmlns_oai)s><oai:record>aap</oai:record>' % namespaces).encode())
+            reader.feed_data(b'<oai:record>noot</oai:record></oai:OAI-PMH>')
+            reader.feed_eof()
+            return [record.text async for record in AsyncPushParser(reader, elementPath='//oai:record', readSize=10)]
+        self.assertEqual(['aap', 'noot'], run(test()))
+
+    def testSlowConsumerStopsReading(self):
+        reads = []
+        class Reader(object):
+            def __init__(self):
+                self._data = b'<records>' + b'<record>aap</record>' * 100 + b'</records>'
+            async def read(self, size):
+                reads.append(size)
+                data, self._data = self._data[:size], self._data[size:]
+                return data
+        async def test():
+            parser = AsyncPushParser(Reader(), elementPath=['records', 'record'], readSize=100, feedSize=20)
+            await parser.__anext__()
+            self.assertEqual(1, len(reads))
+            records = [record async for record in parser]
+            self.assertEqual(99, len(records))
+            self.assertEqual(22, len(reads))
+        run(test())
+
+    def testQueueBoundedByFeedSize(self):
+        async def chunks():
+            yield b'<records>' + b'<record>aap</record>' * 100 + b'</records>'
+        async def test():
+            parser = AsyncPushParser(chunks(), elementPath=['records', 'record'], feedSize=60)
+            sizes = []
+            async for record in parser:
+                sizes.append(len(parser._records))
+            self.assertEqual(100, len(sizes))
+            self.assertTrue(max(sizes) <= 2, sizes)
+        run(test())
+
+    def testOffloadToThread(self):
+        async def chunks():
+            yield b'<records>' + b'<record>aap</record>' * 10 + b'</records>'
+        for engine in ['target', 'native']:
+            records = run(self._records(AsyncPushParser(chunks(), elementPath=['records', 'record'], engine=engine, feedSize=40, offload=True)))
+            self.assertEqual(10, len(records))
+
+    def testSyntaxError(self):
+        async def chunks():
+            yield b'<records><record>aap</record><nope></records>'
+        self.assertRaises(XMLSyntaxError, lambda: run(self._records(AsyncPushParser(chunks(), elementPath=['records', 'record']))))
+
+    def testSyntaxErrorReleasesWorkerThread(self):
+        async def chunks():
+            yield b'<records><record>aap</record><nope></records>'
+        async def test():
+            parser = AsyncPushParser(chunks(), elementPath=['records', 'record'], offload=True)
+            executor = parser._executor
+            with self.assertRaises(XMLSyntaxError):
+                [record async for record in parser]
+            self.assertTrue(executor._shutdown)
+            self.assertEqual([], [record async for record in parser])
+        run(test())
+
+    def testBreakEarlyWithAsyncWith(self):
+        async def chunks():
+            yield b'<records>'
+            for i in range(10):
+                yield b'<record>aap</record>'
+            self.fail('Read too far')
+        async def test():
+            async with AsyncPushParser(chunks(), elementPath=['records', 'record'], offload=True) as parser:
+                executor = parser._executor
+                async for record in parser:
+                    break
+                self.assertFalse(executor._shutdown)
+            self.assertTrue(executor._shutdown)
+            self.assertEqual([], [record async for record in parser])
+            await parser.aclose()
+            return record.text
+        self.assertEqual('aap', run(test()))
+
+    def testAclose(self):
+        async def chunks():
+            yield b'<records>' + b'<record>aap</record>' * 10
+        async def test():
+            parser = AsyncPushParser(chunks(), elementPath=['records', 'record'])
+            self.assertEqual('aap', (await parser.__anext__()).text)
+            await parser.aclose()
+            self.assertEqual([], [record async for record in parser])
+        run(test())
+
+    async def _records(self, parser):
+        return [tostring(record) async for record in parser]
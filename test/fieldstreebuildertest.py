@@ -0,0 +1,79 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from lxml.etree import XMLParser, XML
+
+from meresco.xml import namespaces
+from meresco.xml.fieldstreebuilder import Fields, FieldsTreeBuilder
+from meresco.xml.subtreestreebuilder import SubTreesTreeBuilder
+
+
+class FieldsTreeBuilderTest(TestCase):
+    def testFields(self):
+        builder = SubTreesTreeBuilder(paths={'record': '//oai:record'}, fields={
+                'identifier': 'oai:header/oai:identifier',
+                'status': 'oai:header/@status',
+                'title': '//dc:title',
+                'subject': 'oai:metadata/*/dc:subject',
+                'nothing': 'oai:about',
+                'all': '.',
+            })
+        parser = XMLParser(target=builder)
+        parser.feed('<oai:OAI-PMH %(xmlns_oai)s %(xmlns_dc)s><oai:record>' % namespaces)
+        parser.feed('<oai:header status="deleted"><oai:identifier>id:1</oai:identifier></oai:header>')
+        parser.feed('<oai:metadata><dc><dc:title>The <b>big</b> title</dc:title><!-- no --><dc:subject>a</dc:subject><dc:subject>b</dc:subject></dc></oai:metadata>')
+        parser.feed('</oai:record><oai:record><oai:header><oai:identifier>id:2</oai:identifier></oai:header></oai:record></oai:OAI-PMH>')
+        parser.close()
+        self.assertEqual([
+                {'identifier': ['id:1'], 'status': ['deleted'], 'title': ['The big title'], 'subject': ['a', 'b'], 'nothing': [], 'all': ['id:1The big titleab']},
+                {'identifier': ['id:2'], 'status': [], 'title': [], 'subject': [], 'nothing': [], 'all': ['id:2']},
+            ], [subtree for id, subtree in builder.getSubtrees()])
+
+    def testNestedMatches(self):
+        builder = FieldsTreeBuilder(Fields({'x': '//x', 'lang': '//@xml:lang'}))
+        builder.start('record', {})
+        builder.start('x', {'{%(xml)s}lang' % namespaces: 'nl'})
+        builder.data('a')
+        builder.start('x', {})
+        builder.data('b')
+        builder.end('x')
+        builder.data('c')
+        builder.end('x')
+        builder.end('record')
+        self.assertEqual({'x': ['abc', 'b'], 'lang': ['nl']}, builder.close())
+
+    def testDocumentOrderAsXpath(self):
+        data = '<record><a>x<a>y<a>z</a></a><b><a>w</a></b></a><a>v</a></record>'
+        builder = SubTreesTreeBuilder(paths={'record': '/record'}, fields={'a': '//a'})
+        parser = XMLParser(target=builder)
+        parser.feed(data)
+        parser.close()
+        expected = [''.join(a.itertext()) for a in namespaces.xpath(XML(data), '//a')]
+        self.assertEqual(['xyzw', 'yz', 'z', 'w', 'v'], expected)
+        self.assertEqual([{'a': expected}], [subtree for id, subtree in builder.getSubtrees()])
+
+    def testRawAndFields(self):
+        self.assertRaises(ValueError, lambda: SubTreesTreeBuilder(paths={'record': '//record'}, raw=True, fields={'x': 'x'}))
@@ -0,0 +1,57 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from meresco.xml.lrucache import LruCache
+
+
+class LruCacheTest(TestCase):
+    def testLeastRecentlyUsedIsEvicted(self):
+        cache = LruCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(1, cache['a'])
+        cache['c'] = 3
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertEqual(2, len(cache))
+        self.assertRaises(KeyError, lambda: cache['b'])
+        self.assertEqual({'size': 2, 'length': 2, 'hits': 1, 'misses': 1, 'evictions': 1}, cache.stats())
+
+    def testOverwrite(self):
+        cache = LruCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['a'] = 3
+        cache['c'] = 4
+        self.assertEqual(3, cache['a'])
+        self.assertFalse('b' in cache)
+
+    def testClear(self):
+        cache = LruCache(1)
+        cache['a'] = 1
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertRaises(ValueError, lambda: LruCache(0))
@@ -30,7 +30,9 @@
 from seecr.test import SeecrTestCase
 
 from meresco.xml import namespaces, xpathFirst, xpath
+from meresco.xml.namespaces import _FIRST
 from lxml.etree import XML, _Element
+from sys import intern
 
 
 class NamespacesTest(SeecrTestCase):
@@ -109,12 +111,141 @@ class NamespacesTest(SeecrTestCase):
     def testUriToCurie(self):
         self.assertEqual('dcterms:fluffy', namespaces.uriToCurie(uri='http://purl.org/dc/terms/fluffy'))
 
+    def testUriToCurieOfLongestNamespace(self):
+        ns = namespaces.select('dcterms').copyUpdate({'x': 'http://x.org/ns/', 'sub': 'http://x.org/ns/sub/', 'urn': 'urn:x:'})
+        self.assertEqual('sub:y', ns.uriToCurie('http://x.org/ns/sub/y'))
+        self.assertEqual('x:su', ns.uriToCurie('http://x.org/ns/su'))
+        self.assertEqual('x:', ns.uriToCurie('http://x.org/ns/'))
+        self.assertEqual('urn:item', ns.uriToCurie('urn:x:item'))
+        self.assertEqual('{urn:x:}item', ns.uriToTag('urn:x:item'))
+        self.assertEqual('dcterms:fluffy', ns.uriToCurie('http://purl.org/dc/terms/fluffy'))
+        self.assertEqual(None, ns.uriToCurie('http://x.org/n'))
+        self.assertRaises(ValueError, lambda: ns.uriToCurie('urn:issn:1234'))
+        self.assertRaises(ValueError, lambda: ns.select('x').uriToCurie('urn:x:item'))
+        self.assertEqual(None, namespaces.select().uriToCurie('http://x.org/ns/y'))
+
+    def testUriToCurieOnlyAtNamespaceBoundary(self):
+        for uri in [
+                'http://meresco.org/namespace/harvester/metadata',
+                'http://purl.org/dc/elements/1.1/foo/bar',
+                'http://www.w3.org/1999/xhtmlx',
+                'http://www.w3.org/1999/xhtml',
+                'info:eu-repo/dai/nl/123',
+                'http://x.org/ns/other/y',
+                'http://x.org/ns/sub/y#z',
+            ]:
+            ns = namespaces.copyUpdate({'x': 'http://x.org/ns/', 'sub': 'http://x.org/ns/sub/'})
+            self.assertEqual(None, ns.uriToCurie(uri), uri)
+        self.assertEqual('dc:foo.bar-2', namespaces.uriToCurie('http://purl.org/dc/elements/1.1/foo.bar-2'))
+
+    def testUriToCurieWithAnyLocalPart(self):
+        self.assertEqual('dbpr:1984', namespaces.uriToCurie('http://dbpedia.org/resource/1984'))
+        self.assertEqual('dbpr:Amsterdam_(city)', namespaces.uriToCurie('http://dbpedia.org/resource/Amsterdam_(city)'))
+        self.assertEqual('dbpr:Caf%C3%A9', namespaces.uriToCurie('http://dbpedia.org/resource/Caf%C3%A9'))
+        self.assertEqual('time:2020', namespaces.uriToCurie(namespaces.curieToUri('time:2020')))
+        ns = namespaces.copyUpdate({'sub': 'http://x.org/ns/sub/'})
+        self.assertEqual('sub:1', ns.uriToCurie('http://x.org/ns/sub/1'))
+
     def testUriToTag(self):
         self.assertEqual('{http://purl.org/dc/terms/}fluffy', namespaces.uriToTag(uri='http://purl.org/dc/terms/fluffy'))
 
     def testTagToUri(self):
         self.assertEqual('http://purl.org/dc/terms/fluffy', namespaces.tagToUri(tag='{http://purl.org/dc/terms/}fluffy'))
 
+    def testUriToTagOfDerivedNamespaces(self):
+        ns = namespaces.select('dc').copyUpdate({'x': 'u:ri/x#'})
+        self.assertEqual('{u:ri/x#}name', ns.uriToTag('u:ri/x#name'))
+        self.assertEqual('u:ri/x#name', ns.tagToUri('{u:ri/x#}name'))
+        self.assertRaises(KeyError, lambda: ns.tagToUri('{http://purl.org/dc/terms/}fluffy'))
+
+    def testConversionCaches(self):
+        ns = namespaces.select('dc', 'dcterms')
+        self.assertEqual('{http://purl.org/dc/elements/1.1/}title', ns.curieToTag('dc:title'))
+        self.assertEqual('{http://purl.org/dc/elements/1.1/}title', ns.curieToTag('dc:title'))
+        self.assertEqual('dcterms:fluffy', ns.uriToCurie('http://purl.org/dc/terms/fluffy'))
+        stats = ns.cacheStats()
+        self.assertEqual(['curieToTag', 'curieToUri', 'tagToCurie', 'uriToCurie', 'uriToTag', 'tagToUri'], list(stats))
+        self.assertEqual({'size': 4096, 'length': 1, 'hits': 1, 'misses': 1}, stats['curieToTag'])
+        self.assertEqual({'size': 4096, 'length': 1, 'hits': 0, 'misses': 1}, stats['uriToCurie'])
+        self.assertEqual({'size': 4096, 'length': 0, 'hits': 0, 'misses': 0}, stats['tagToUri'])
+
+        ns.setCacheSize(2)
+        for uri in ['http://purl.org/dc/terms/a', 'http://purl.org/dc/terms/b', 'http://purl.org/dc/terms/c', 'http://purl.org/dc/terms/c']:
+            ns.uriToTag(uri)
+        self.assertEqual({'size': 2, 'length': 2, 'hits': 1, 'misses': 3}, ns.cacheStats()['uriToTag'])
+        self.assertEqual({'size': 2, 'length': 2, 'hits': 0, 'misses': 3}, ns.cacheStats()['uriToCurie'])
+        self.assertEqual('{http://purl.org/dc/terms/}a', ns.uriToTag('http://purl.org/dc/terms/a'))
+        self.assertEqual(4096, namespaces.select('dc').cacheStats()['curieToTag']['size'])
+
+    def testBulkConversions(self):
+        self.assertEqual(['{http://purl.org/dc/elements/1.1/}title', '{http://purl.org/dc/terms/}title', '{http://purl.org/dc/elements/1.1/}title'],
+                namespaces.curiesToTags(['dc:title', 'dcterms:title', 'dc:title']))
+        self.assertEqual(['dc:title', 'dcterms:title'],
+                namespaces.tagsToCuries(('{http://purl.org/dc/elements/1.1/}title', '{http://purl.org/dc/terms/}title')))
+        self.assertEqual([], namespaces.curiesToTags([]))
+        self.assertRaises(ValueError, lambda: namespaces.tagsToCuries(['title']))
+
+    def testBulkConversionsOfIterators(self):
+        self.assertEqual(['{http://purl.org/dc/elements/1.1/}title', '{http://purl.org/dc/elements/1.1/}title'],
+                namespaces.curiesToTags(curie for curie in ['dc:title', 'dc:title']))
+        self.assertEqual(['dc:title'], namespaces.tagsToCuries(iter(['{http://purl.org/dc/elements/1.1/}title'])))
+
+    def testLookupTable(self):
+        table = namespaces.lookupTable(['dc:title', 'dcterms:title'])
+        self.assertEqual({
+                'dc:title': '{http://purl.org/dc/elements/1.1/}title',
+                '{http://purl.org/dc/elements/1.1/}title': 'dc:title',
+                'dcterms:title': '{http://purl.org/dc/terms/}title',
+                '{http://purl.org/dc/terms/}title': 'dcterms:title',
+            }, dict(table))
+        def setItem():
+            table['dc:subject'] = '{http://purl.org/dc/elements/1.1/}subject'
+        self.assertRaises(TypeError, setItem)
+
+    def testRewriteTree(self):
+        root = XML('<record %(xmlns_dc)s %(xmlns_dcterms)s><dcterms:title dcterms:lang="nl" n="1">t</dcterms:title><!-- c --><x n="2"><dc:title/></x></record>' % namespaces)
+        self.assertTrue(root is namespaces.rewriteTree(root, {
+                'dcterms:title': 'dc:title',
+                'dcterms:lang': '{http://www.w3.org/XML/1998/namespace}lang',
+                'x': 'dc:x',
+                'n': 'number',
+            }))
+        self.assertEqual(['record', 'dc:title', 'dc:x', 'dc:title'], [curie for element, curie in namespaces.iterCuries(root)])
+        self.assertEqual({'{http://www.w3.org/XML/1998/namespace}lang': 'nl', 'number': '1'}, dict(root[0].attrib))
+        self.assertEqual({'number': '2'}, dict(root[2].attrib))
+
+    def testIterCuries(self):
+        root = XML('<record %(xmlns_dc)s xmlns:x="u:ri/x#"><dc:title/><?pi?><other/></record>' % namespaces)
+        self.assertEqual([('record', 'record'), ('{http://purl.org/dc/elements/1.1/}title', 'dc:title'), ('other', 'other')],
+                [(element.tag, curie) for element, curie in namespaces.iterCuries(root)])
+        root.append(XML('<x:unknown xmlns:x="u:ri/x#"/>'))
+        self.assertRaises(KeyError, lambda: list(namespaces.iterCuries(root)))
+
+    def testTags(self):
+        self.assertEqual('{http://purl.org/dc/elements/1.1/}title', namespaces.tags.dc.title)
+        self.assertTrue(namespaces.tags.dc.title is namespaces.tags.dc.title)
+        self.assertTrue(namespaces.tags.dc['title'] is namespaces.tags.dc.title)
+        self.assertTrue(namespaces.tags.dc.title is intern(namespaces.curieToTag('dc:title')))
+        self.assertEqual('{http://purl.org/dc/terms/}date-issued', namespaces.tags.dcterms['date-issued'])
+        self.assertEqual(XML('<dc:title %(xmlns_dc)s/>' % namespaces).tag, namespaces.tags.dc.title)
+        self.assertRaises(AttributeError, lambda: namespaces.tags.unknown)
+
+    def testTagsOfDerivedNamespaces(self):
+        ns = namespaces.select('dc').copyUpdate({'x': 'u:ri/x#', 'dc': 'u:ri/dc#'})
+        self.assertEqual('{u:ri/x#}name', ns.tags.x.name)
+        self.assertEqual('{u:ri/dc#}title', ns.tags.dc.title)
+        self.assertEqual('{http://purl.org/dc/elements/1.1/}title', namespaces.tags.dc.title)
+        self.assertRaises(AttributeError, lambda: ns.tags.dcterms)
+
+    def testTagsReadonly(self):
+        def setTag():
+            namespaces.tags.dc.title = 'other'
+        def setNamespace():
+            namespaces.tags.dc = None
+        self.assertRaises(TypeError, setTag)
+        self.assertRaises(TypeError, setNamespace)
+        self.assertEqual('{http://purl.org/dc/elements/1.1/}title', namespaces.tags.dc.title)
+
     def testXpath(self):
         self.assertEqual(_Element, type(xpath(ANY_XML, "/root/sub")[0]))
         self.assertEqual(str, type(xpath(ANY_XML, "/root/sub1/text()")[0]))
@@ -126,6 +257,60 @@ class NamespacesTest(SeecrTestCase):
         self.assertEqual(str, type(xpathFirst(ANY_XML, "/root/sub1/text()")))
         self.assertEqual("text", xpathFirst(ANY_XML, "/root/sub1/text()"))
 
+    def testXpathCache(self):
+        ns = namespaces.select('dc')
+        record = XML('<record %(xmlns_dc)s><dc:title>one</dc:title><dc:title>two</dc:title></record>' % namespaces)
+        self.assertEqual(['one', 'two'], ns.xpath(record, 'dc:title/text()'))
+        self.assertEqual('one', ns.xpathFirst(record, 'dc:title/text()'))
+        self.assertEqual('two', ns.xpathFirst(record, 'dc:title[2]/text()'))
+        self.assertEqual(['one', 'two'], ns.xpath(record, 'dc:title/text()'))
+        self.assertEqual({'size': 1024, 'length': 4, 'hits': 1, 'misses': 4, 'evictions': 0}, ns.xpathCacheStats())
+
+        other = ns.copyUpdate({'dc': 'uri:other'})
+        self.assertEqual([], other.xpath(record, 'dc:title/text()'))
+        self.assertEqual(1, other.xpathCacheStats()['misses'])
+
+    def testXpathFirstOfOtherResults(self):
+        record = XML('<record><a>1</a><a>2</a><b/></record>')
+        for i in range(2):
+            self.assertEqual('1', xpathFirst(record, 'a/text()'))
+            self.assertEqual('b', xpathFirst(record, '(a|b)[last()]').tag)
+            self.assertEqual('r', xpathFirst(record, 'name(.)'))
+            self.assertEqual('1', xpathFirst(record, 'string(a)'))
+            self.assertEqual(None, xpathFirst(record, 'c'))
+
+    def testXpathFirstOfSimplePaths(self):
+        record = XML('''<record xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:x="u:ri/x#">
+            <!-- comment --><dc:title/><x:title/>
+            <dc:title lang="nl" x:lang="en"><!-- c -->one<b>bold</b>more</dc:title>
+            <dc:title lang="en">two</dc:title>
+            <group><dc:title>three</dc:title></group><group><x:a/><dc:title x:lang="de">four</dc:title></group>
+        </record>''')
+        ns = namespaces.copyUpdate({'x': 'u:ri/x#'})
+        for path in ['dc:title', 'dc:title/text()', 'dc:title/@lang', 'dc:title/@x:lang', '*/dc:title/text()',
+                'group/*', 'group/x:*/text()', 'group/dc:title/@x:lang', 'x:title', 'dc:creator', 'dc:creator/text()',
+                'text()', '@lang', 'group/text()', 'group/@id', '*', 'dc:title[2]/text()', '//dc:title/@lang',
+                './dc:title/text()', 'dc:title/@*']:
+            nodes = ns.xpath(record, path)
+            self.assertEqual(nodes[0] if nodes else None, ns.xpathFirst(record, path), path)
+        self.assertNotEqual(None, ns._xpaths[_FIRST, 'group/x:*/text()'])
+        self.assertEqual(None, ns._xpaths[_FIRST, 'dc:title[2]/text()'])
+        self.assertEqual(None, ns._xpaths[_FIRST, 'dc:title/@*'])
+        self.assertEqual('two', ns.xpathFirst(record.getroottree(), 'dc:title[@lang="en"]/text()'))
+
+    def testXpathErrors(self):
+        from lxml.etree import XPathEvalError
+        self.assertRaises(XPathEvalError, lambda: xpath(ANY_XML, '/root/['))
+        self.assertRaises(XPathEvalError, lambda: xpath(ANY_XML, '/unknown:root'))
+
+    def testXpathAfterFailedXpathFirst(self):
+        from lxml.etree import XPathEvalError
+        for path in ['foo:x', '$undefined', 'unknown(.)', '/root/[']:
+            ns = namespaces.select('dc')
+            self.assertRaises(XPathEvalError, lambda: ns.xpathFirst(ANY_XML, path))
+            self.assertRaises(XPathEvalError, lambda: ns.xpath(ANY_XML, '(%s)[1]' % path))
+            self.assertRaises(XPathEvalError, lambda: ns.xpathFirst(ANY_XML, path))
+
     def testCurieToTagSpeed(self):
         from time import time
         t = 0
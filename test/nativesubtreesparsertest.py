@@ -0,0 +1,92 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from lxml.etree import tostring
+from meresco.xml import namespaces
+from meresco.xml.nativesubtreesparser import NativeSubtreesParser
+
+
+class NativeSubtreesParserTest(TestCase):
+    def testSubtrees(self):
+        parser = NativeSubtreesParser({'record': '/OAI-PMH/*/oai:record', 'header': ['OAI-PMH', 'ListRecords', '{%(oai)s}header' % namespaces]})
+        parser.feed('<OAI-PMH %(xmlns_oai)s %(xmlns_dc)s><ListRecords><oai:record>1</oai:record>\n<oai:header/>' % namespaces)
+        parser.feed('<oai:record><dc:title>2</dc:title><oai:record>nested</oai:record></oai:record></ListRecords><Other><oai:record/></Other></OAI-PMH>')
+        parser.close()
+
+        subtrees = list(parser.getSubtrees())
+        self.assertEqual(['record', 'header', 'record', 'record'], [id for id, subtree in subtrees])
+        self.assertEqual([
+                '<oai:record xmlns:oai="%(oai)s" xmlns:dc="%(dc)s">1</oai:record>' % namespaces,
+                '<oai:header xmlns:oai="%(oai)s" xmlns:dc="%(dc)s"/>' % namespaces,
+                '<oai:record xmlns:oai="%(oai)s" xmlns:dc="%(dc)s"><dc:title>2</dc:title><oai:record>nested</oai:record></oai:record>' % namespaces,
+                '<oai:record xmlns:oai="%(oai)s" xmlns:dc="%(dc)s"/>' % namespaces,
+            ], [tostring(subtree, encoding=str) for id, subtree in subtrees])
+        self.assertEqual(None, subtrees[0][1].getparent())
+
+    def testMinimalNsmap(self):
+        parser = NativeSubtreesParser({'record': '/OAI-PMH/*/oai:record'}, minimalNsmap=True)
+        parser.feed('<OAI-PMH %(xmlns_oai)s %(xmlns_dc)s><ListRecords><oai:record>1</oai:record><oai:record><dc:title>2</dc:title></oai:record></ListRecords></OAI-PMH>' % namespaces)
+        parser.close()
+        self.assertEqual([
+                '<oai:record xmlns:oai="%(oai)s">1</oai:record>' % namespaces,
+                '<oai:record xmlns:oai="%(oai)s" xmlns:dc="%(dc)s"><dc:title>2</dc:title></oai:record>' % namespaces,
+            ], [tostring(subtree, encoding=str) for id, subtree in parser.getSubtrees()])
+
+    def testDefaultNamespacePreserved(self):
+        parser = NativeSubtreesParser({'record': '/oai:OAI-PMH/oai:record'})
+        parser.feed('<OAI-PMH xmlns="%(oai)s" %(xmlns_xsi)s><record><header/></record></OAI-PMH>' % namespaces)
+        parser.close()
+        self.assertEqual(['<record xmlns="%(oai)s" %(xmlns_xsi)s><header/></record>' % namespaces], [tostring(subtree, encoding=str) for id, subtree in parser.getSubtrees()])
+
+    def testNamespacesUsedInContentAreDeclared(self):
+        parser = NativeSubtreesParser({'record': '/oai:OAI-PMH/oai:record'})
+        parser.feed('<OAI-PMH xmlns="%(oai)s" %(xmlns_xsi)s %(xmlns_dcterms)s><record><date xsi:type="dcterms:W3CDTF">2026</date></record></OAI-PMH>' % namespaces)
+        parser.close()
+        subtree = list(parser.getSubtrees())[0][1]
+        self.assertEqual({None: namespaces.oai, 'xsi': namespaces.xsi, 'dcterms': namespaces.dcterms}, subtree.nsmap)
+
+    def testProcessedElementsAreRemovedFromTheDocument(self):
+        parser = NativeSubtreesParser({'record': ['records', 'record']})
+        parser.feed('<records><record>1</record><other/><record>2</record><other/></records>')
+        self.assertEqual(2, len(list(parser.getSubtrees())))
+        root = parser._parser.close()
+        self.assertEqual(['other'], [child.tag for child in root])
+
+    def testCanParse(self):
+        self.assertTrue(NativeSubtreesParser.canParse({'a': '/a/b', 'b': ['a', 'c']}))
+        self.assertTrue(NativeSubtreesParser.canParse({'a': '/*/*'}))
+        self.assertFalse(NativeSubtreesParser.canParse({'a': '//b'}))
+        self.assertFalse(NativeSubtreesParser.canParse({'a': '/a/b', 'b': ['a']}))
+        self.assertRaises(ValueError, lambda: NativeSubtreesParser({'a': '//b'}))
+
+    def testIsFull(self):
+        parser = NativeSubtreesParser({'record': ['records', 'record']}, maxSubtrees=2)
+        parser.feed('<records><record/>')
+        self.assertFalse(parser.isFull())
+        parser.feed('<record/>')
+        self.assertTrue(parser.isFull())
+        list(parser.getSubtrees())
+        self.assertFalse(parser.isFull())
@@ -24,7 +24,7 @@
 ## end license ##
 
 from unittest import TestCase
-from meresco.xml.normalize import Normalize
+from meresco.xml.normalize import Normalize, impure, _firstChars, _literalPrefix
 
 """
 regexp: http://docs.python.org/lib/re-syntax.html
@@ -83,3 +83,126 @@ class NormalizeTest(TestCase):
 		self.assertEqual('vuur', normalize.process('noot', noMatchResult='vuur'))
 
 
+
+	def testFirstMatchingRuleWins(self):
+		rules = [('a(b)', 'first %s'), ('(a)(b)', 'second %s%s'), ('a', 'third'), ('(?P<x>c)', 'named %s'), ('(d)\\1', 'backref %s'), ('(?i)E(.)', 'flags %s'), ('(e)(.)', 'last %s%s')]
+		normalize = Normalize(rules, noMatchResult=None)
+		self.assertEqual(2, len(normalize._segmentsFor('ab')))
+		self.assertEqual(1, len(normalize._segmentsFor('x')))
+		self.assertEqual('first b', normalize.process('ab'))
+		self.assertEqual('third', normalize.process('ac'))
+		self.assertEqual('named c', normalize.process('c'))
+		self.assertEqual('backref d', normalize.process('dd'))
+		self.assertEqual(None, normalize.process('de'))
+		self.assertEqual('flags x', normalize.process('ex'))
+		self.assertEqual(None, normalize.process('x'))
+
+	def testCombinedRulesKeepTheirGroups(self):
+		rules = [('x(a)?(b)', '%s-%s'), ('(y)(z)|(w)', '%s %s %s', (str, str, str)), ('v(.*)', '%s', (str.upper,))]
+		normalize = Normalize(rules)
+		self.assertEqual(1, len(normalize._segmentsFor('yz')))
+		self.assertEqual('None-b', normalize.process('xb'))
+		self.assertEqual('y z None', normalize.process('yz'))
+		self.assertEqual('None None w', normalize.process('w'))
+		self.assertEqual('UUR', normalize.process('vuur'))
+
+	def testLongRuleListsAreSplit(self):
+		normalize = Normalize([('(r)(%d)$' % i, '%%s%%s-%d' % i) for i in range(100)])
+		self.assertEqual(4, len(normalize._segmentsFor('r1')))
+		self.assertEqual(['r%d-%d' % (i, i) for i in range(100)], [normalize.process('r%d' % i) for i in range(100)])
+
+	def testCache(self):
+		calls = []
+		def lower(value):
+			calls.append(value)
+			return value.lower()
+		normalize = Normalize([('b(OO)m', '%s', (lower,))], cacheSize=2)
+		self.assertEqual('oo', normalize.process('bOOm'))
+		self.assertEqual('oo', normalize.process('bOOm'))
+		self.assertEqual('noot', normalize.process('noot'))
+		self.assertEqual(None, normalize.process('noot', noMatchResult=None))
+		self.assertEqual('oo', normalize.process('bOOm'))
+		self.assertEqual(['OO', 'OO'], calls)
+		self.assertEqual({'size': 2, 'length': 2, 'hits': 1, 'misses': 4, 'evictions': 2}, normalize.cacheStats())
+		self.assertEqual(None, Normalize([]).cacheStats())
+
+	def testImpureFunctionsAreNotCached(self):
+		counter = iter(range(10))
+		normalize = Normalize([('a(.)', '%s', (impure(lambda value: '%s%d' % (value, next(counter))),)), ('(b)', '%s')], cacheSize=10)
+		self.assertEqual(['x0', 'x1', 'b', 'b'], [normalize.process(value) for value in ['ax', 'ax', 'b', 'b']])
+		self.assertEqual(1, normalize.cacheStats()['hits'])
+
+	def testUnhashableNoMatchResult(self):
+		normalize = Normalize([('(a)', '%s')], cacheSize=10)
+		self.assertEqual([], normalize.process('b', noMatchResult=[]))
+
+	def testProcessMany(self):
+		normalize = Normalize([('aap (.*)', '%s'), ('noot (.*)', '%s', (str.upper,))], cacheSize=10)
+		values = ['aap 1', 'noot 2', 'mies', 'aap 1', 'noot 2', 'aap 3']
+		self.assertEqual(['1', '2', 'mies', '1', '2', '3'], list(normalize.processMany(values, batchSize=4)))
+		self.assertEqual(['1', '2', None, '1', '2', '3'], list(normalize.processMany(iter(values), noMatchResult=None)))
+		self.assertEqual((1, 8), (normalize.cacheStats()['hits'], normalize.cacheStats()['misses']))
+
+	def testProcessManyInProcesses(self):
+		normalize = Normalize([('aap (.*)', '%s'), ('noot (.*)', '%s', (str.upper,))], noMatchResult='-')
+		values = ['aap %d' % (i % 7) for i in range(20)] + ['noot x', 'mies'] * 5
+		expected = [normalize.process(value) for value in values]
+		self.assertEqual(expected, list(normalize.processMany(values, batchSize=8, processes=2, parallelThreshold=3)))
+		self.assertEqual(['x' if value == '-' else value for value in expected], list(normalize.processMany(values, noMatchResult='x', batchSize=8, processes=2, parallelThreshold=3)))
+
+	def testPickle(self):
+		from pickle import dumps, loads
+		normalize = loads(dumps(Normalize([('aap (.*)', '%s', (str.upper,))], cacheSize=5)))
+		self.assertEqual('NOOT', normalize.process('aap noot'))
+		self.assertEqual('mies', normalize.process('mies'))
+		self.assertEqual(5, normalize.cacheStats()['size'])
+
+	def testFirstChars(self):
+		from re import compile
+		firstChars = lambda pattern: _firstChars(compile(pattern))
+		self.assertEqual(frozenset('I'), firstChars('^ISBN(\\d+)'))
+		self.assertEqual(frozenset('abcx'), firstChars('[a-cx](.)'))
+		self.assertEqual(frozenset('acd'), firstChars('(?:ab|c)?d'))
+		self.assertEqual(frozenset('ud'), firstChars('urn:nbn:|doi:'))
+		self.assertEqual(frozenset('ab'), firstChars('\\ba*b'))
+		self.assertEqual(frozenset('x'), firstChars('(?=x)x'))
+		for pattern in ['(?i)abc', '(?i:a)', '[^a]', '\\d', '.', 'a*', '(a|)', '(a)?', '[a-z\\d]']:
+			self.assertEqual(None, firstChars(pattern), pattern)
+
+	def testOnlyPossibleRulesAreTried(self):
+		rules = [('ISBN(.*)', 'isbn %s'), ('(.)SBN(.*)', 'any %s %s'), ('urn:nbn:(.*)', 'nbn %s'), ('(.*)', 'rest %s')]
+		normalize = Normalize(rules)
+		self.assertEqual(['isbn 1', 'any X 2', 'nbn 3', 'rest uri', 'rest '], [normalize.process(value) for value in ['ISBN1', 'XSBN2', 'urn:nbn:3', 'uri', '']])
+		self.assertEqual(1, len(normalize._segmentsFor('u')))
+		self.assertEqual([rules[1][1], rules[3][1]], [rule[1] for rule, groups in normalize._segmentsFor('q')[0][1].values()])
+
+	def testProfile(self):
+		normalize = Normalize([('aap (.*)', '%s'), ('(.*) noot', '%s', (str.upper,))], profile=True)
+		self.assertEqual(['1', 'noot', 'mies', 'Y'], [normalize.process(value) for value in ['aap 1', 'aap noot', 'mies', 'y noot']])
+		stats = normalize.profileStats()
+		self.assertEqual(4, stats['calls'])
+		self.assertEqual(1, stats['noMatches'])
+		self.assertEqual([('aap (.*)', 2, 2), ('(.*) noot', 2, 1)], [(rule['pattern'], rule['tried'], rule['hits']) for rule in stats['rules']])
+		report = normalize.report().split('\n')
+		self.assertEqual('4 calls, 1 without match (25.0%)', report[0])
+		self.assertEqual(4, len(report))
+		self.assertEqual(None, Normalize([]).profileStats())
+
+	def testLiteralPrefix(self):
+		from re import compile
+		literalPrefix = lambda pattern: _literalPrefix(compile(pattern))
+		self.assertEqual('ISBN', literalPrefix('^ISBN(\\d+)'))
+		self.assertEqual('urn:nbn:nl', literalPrefix('urn:(nbn):nl(.*)'))
+		self.assertEqual('ab', literalPrefix('a(b)(c|d)'))
+		self.assertEqual('', literalPrefix('(?i)abc'))
+		self.assertEqual('', literalPrefix('.*'))
+
+	def testReorderKeepsFirstMatch(self):
+		rules = [('urn:(.*)', 'urn %s'), ('isbn:(.*)', 'isbn %s'), ('doi:(.*)', 'doi %s'), ('(.*):(.*)', 'any %s %s'), ('issn:(.*)', 'issn %s')]
+		normalize = Normalize(rules, profile=True)
+		values = ['issn:1'] * 5 + ['doi:2'] * 4 + ['urn:nbn:3'] * 3 + ['isbn:4', 'x:y', 'none']
+		expected = [normalize.process(value) for value in values]
+		normalize.reorder()
+		self.assertEqual(['doi:(.*)', 'urn:(.*)', 'isbn:(.*)', '(.*):(.*)', 'issn:(.*)'], [rule[0].pattern for rule in normalize.rules])
+		self.assertEqual(expected, [normalize.process(value) for value in values])
+		self.assertRaises(ValueError, lambda: Normalize(rules).reorder())
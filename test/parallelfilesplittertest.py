@@ -0,0 +1,125 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from seecr.test import SeecrTestCase
+
+from os.path import join
+
+from lxml.etree import tostring, XML
+from meresco.xml.parallelfilesplitter import ParallelFileSplitter
+from meresco.xml.parallelsaxfileparser import WorkerError
+from meresco.xml.subtreestreebuilder import SimpleSaxFileParser
+
+
+def recordNumber(data):
+    return int(XML(data).attrib['n'])
+
+
+def parseBroken(data):
+    return XML(data[:-1])
+
+
+class ParallelFileSplitterTest(SeecrTestCase):
+    def setUp(self):
+        SeecrTestCase.setUp(self)
+        self.filename = join(self.tempdir, 'records.xml')
+
+    def testSameSubtreesAsSequentialParser(self):
+        self.writeRecords(100)
+        path = ['{u:ri/default#}root', '{u:ri/default#}records', '{u:ri/default#}record']
+        expected = []
+        with open(self.filename, 'rb') as f:
+            SimpleSaxFileParser(f, path, callback=lambda subtree: expected.append(tostring(subtree))).start()
+
+        result = [tostring(subtree) for subtree in ParallelFileSplitter(self.filename, path, processes=2, rangeSize=500).subtrees()]
+        self.assertEqual(100, len(result))
+        self.assertEqual(expected, result)
+
+    def testResultsOfWorker(self):
+        self.writeRecords(50)
+        splitter = ParallelFileSplitter(self.filename, '/{u:ri/default#}root/{u:ri/default#}records/{u:ri/default#}record', processes=2, rangeSize=200)
+        self.assertEqual(list(range(50)), list(splitter.results(recordNumber)))
+
+    def testOneRange(self):
+        self.writeRecords(3)
+        splitter = ParallelFileSplitter(self.filename, ['{u:ri/default#}root', '{u:ri/default#}records', '{u:ri/default#}record'], processes=1)
+        self.assertEqual([0, 1, 2], list(splitter.results(recordNumber)))
+
+    def testPrefixedRecordsAndEncoding(self):
+        with open(self.filename, 'wb') as f:
+            f.write('<?xml version="1.0" encoding="ISO-8859-1"?>\n<p:records xmlns:p="u:ri/prefixed#"><p:record n="0">caf\xe9</p:record><p:record n="1"/></p:records>'.encode('iso-8859-1'))
+        subtrees = list(ParallelFileSplitter(self.filename, ['{u:ri/prefixed#}records', '{u:ri/prefixed#}record'], processes=1, rangeSize=1).subtrees())
+        self.assertEqual(['caf\xe9', None], [subtree.text for subtree in subtrees])
+        self.assertEqual({'p': 'u:ri/prefixed#'}, subtrees[0].nsmap)
+
+    def testRecordStartTagsInContent(self):
+        with open(self.filename, 'w') as f:
+            f.write('<records>%s</records>' % ''.join(
+                '<record n="%d"><![CDATA[<record x>]]><!-- <record> --><?pi <record ?><record><record/></record></record><!-- <record/> -->' % i
+                for i in range(40)))
+        expected = []
+        SimpleSaxFileParser(self.filename, ['records', 'record'], callback=lambda subtree: expected.append(tostring(subtree))).start()
+        for rangeSize in [1, 7, 50, 200]:
+            self.assertEqual(expected, list(ParallelFileSplitter(self.filename, ['records', 'record'], processes=2, rangeSize=rangeSize).results()))
+        self.assertEqual(list(range(40)), list(ParallelFileSplitter(self.filename, ['records', 'record'], processes=2, rangeSize=7).results(recordNumber)))
+
+    def testInternalDtdEntities(self):
+        with open(self.filename, 'w') as f:
+            f.write('<?xml version="1.0"?>\n<!DOCTYPE records [\n  <!ENTITY ent "aap">\n  <!ENTITY x "<b>&ent;</b>">\n]>\n<records>%s</records>' % ''.join(
+                '<record n="%d">&ent;&x;</record>' % i for i in range(20)))
+        expected = []
+        SimpleSaxFileParser(self.filename, ['records', 'record'], callback=lambda subtree: expected.append(tostring(subtree))).start()
+        self.assertEqual(b'<record n="0">aap<b>aap</b></record>', expected[0])
+        self.assertEqual(expected, list(ParallelFileSplitter(self.filename, ['records', 'record'], processes=2, rangeSize=50).results()))
+
+    def testInvalidDocument(self):
+        with open(self.filename, 'w') as f:
+            f.write('<records>%s<record n="1000"><x></record><record n="1001"/></records>' % ''.join('<record n="%d"/>' % i for i in range(1000)))
+        splitter = ParallelFileSplitter(self.filename, ['records', 'record'], processes=1, rangeSize=100)
+        try:
+            list(splitter.results())
+            self.fail()
+        except ValueError as e:
+            self.assertTrue(str(e).startswith('Records from byte '), str(e))
+
+    def testWorkerError(self):
+        self.writeRecords(3)
+        splitter = ParallelFileSplitter(self.filename, ['{u:ri/default#}root', '{u:ri/default#}records', '{u:ri/default#}record'], processes=1)
+        self.assertRaises(WorkerError, lambda: list(splitter.results(parseBroken)))
+
+    def testNoRecords(self):
+        with open(self.filename, 'w') as f:
+            f.write('<records><other/></records>')
+        self.assertEqual([], list(ParallelFileSplitter(self.filename, ['records', 'record']).subtrees()))
+
+    def testUnsupportedPaths(self):
+        self.assertRaises(ValueError, lambda: ParallelFileSplitter(self.filename, '//record'))
+        self.assertRaises(ValueError, lambda: ParallelFileSplitter(self.filename, '/records/*'))
+
+    def writeRecords(self, count):
+        with open(self.filename, 'w') as f:
+            f.write('<?xml version="1.0"?>\n<!-- <record> -->\n<root xmlns="u:ri/default#" xmlns:other="u:ri/other#"><records xmlns:pre="u:ri/prefixed#">\n')
+            for i in range(count):
+                f.write('  <record n="%d"><pre:title>Title %d</pre:title><other:x/></record>\n' % (i, i))
+            f.write('</records>\n</root>\n')
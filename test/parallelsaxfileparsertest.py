@@ -0,0 +1,106 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from threading import Event
+from time import sleep
+
+from lxml.etree import XML
+from meresco.xml.parallelsaxfileparser import ParallelSaxFileParser, WorkerError
+
+
+def recordText(data):
+    return XML(data).text
+
+def slowFirst(data):
+    if data == b'<b>0</b>':
+        sleep(0.1)
+    return data
+
+def parseBroken(data):
+    return XML(data[:-1])
+
+def failOnTwo(data):
+    if data == b'<b>2</b>':
+        raise ValueError(data)
+    return data
+
+
+class ParallelSaxFileParserTest(TestCase):
+    def testProcessPool(self):
+        result = []
+        ParallelSaxFileParser(stream=StringIO(xmlWith(100)), path=['a', 'b'], worker=recordText, callback=result.append, processes=2).start()
+        self.assertEqual([str(i) for i in range(100)], result)
+
+    def testOrderedDelivery(self):
+        result = []
+        with ThreadPoolExecutor(4) as executor:
+            ParallelSaxFileParser(stream=StringIO(xmlWith(10)), path=['a', 'b'], worker=slowFirst, callback=result.append, executor=executor).start()
+        self.assertEqual([b'<b>%d</b>' % i for i in range(10)], result)
+
+    def testUnorderedDelivery(self):
+        result = []
+        with ThreadPoolExecutor(4) as executor:
+            ParallelSaxFileParser(stream=StringIO(xmlWith(10)), path=['a', 'b'], worker=slowFirst, callback=result.append, executor=executor, ordered=False).start()
+        self.assertEqual(b'<b>0</b>', result[-1])
+        self.assertEqual(set(b'<b>%d</b>' % i for i in range(10)), set(result))
+
+    def testMaxInFlight(self):
+        release = Event()
+        started = []
+        def worker(data):
+            started.append(data)
+            release.wait()
+            return data
+        startedWhenDelivered = []
+        def callback(data):
+            startedWhenDelivered.append(len(started))
+        with ThreadPoolExecutor(4) as executor:
+            executor.submit(lambda: (sleep(0.1), release.set()))
+            ParallelSaxFileParser(stream=StringIO(xmlWith(3)), path=['a', 'b'], worker=worker, callback=callback, executor=executor, maxInFlight=2).start()
+        self.assertEqual(3, len(startedWhenDelivered))
+        self.assertEqual(2, startedWhenDelivered[0])
+
+    def testWorkerErrorIsRaised(self):
+        result = []
+        with ThreadPoolExecutor(1) as executor:
+            parser = ParallelSaxFileParser(stream=StringIO(xmlWith(100)), path=['a', 'b'], worker=failOnTwo, callback=result.append, executor=executor, maxInFlight=1)
+            self.assertRaises(ValueError, parser.start)
+        self.assertEqual([b'<b>0</b>', b'<b>1</b>'], result)
+
+
+    def testUnpicklableWorkerErrorIsRaised(self):
+        parser = ParallelSaxFileParser(stream=StringIO(xmlWith(3)), path=['a', 'b'], worker=parseBroken, callback=list, processes=1)
+        try:
+            parser.start()
+            self.fail()
+        except WorkerError as e:
+            self.assertTrue(str(e).startswith('XMLSyntaxError: '), str(e))
+
+
+def xmlWith(count):
+    return '<a>%s</a>' % ''.join('<b>%d</b>' % i for i in range(count))
@@ -0,0 +1,130 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from lxml.etree import XML
+
+from meresco.xml import namespaces
+from meresco.xml.pathmatcher import PathMatcher, parsePath, parseFieldPath
+
+
+class PathMatcherTest(TestCase):
+    def testExactPaths(self):
+        matcher = PathMatcher({'records': ['records'], 'record': ['records', 'record']})
+        records = matcher.initial.next('records')
+        self.assertEqual(('records',), records.accepts)
+        record = records.next('record')
+        self.assertEqual(('record',), record.accepts)
+        self.assertEqual((), record.next('record').accepts)
+        self.assertEqual((), matcher.initial.next('record').accepts)
+
+    def testSeveralIdsForOnePath(self):
+        matcher = PathMatcher({'one': ['a', 'b'], 'two': ['a', 'b']})
+        self.assertEqual(('one', 'two'), matcher.initial.next('a').next('b').accepts)
+
+    def testTransitionsAreShared(self):
+        matcher = PathMatcher({'record': ['records', 'record']})
+        records = matcher.initial.next('records')
+        self.assertTrue(records is matcher.initial.next('records'))
+        self.assertTrue(records.next('record') is records.next('record'))
+        dead = records.next('other')
+        self.assertTrue(dead is matcher.initial.next('other'))
+        self.assertTrue(dead is dead.next('records'))
+
+    def testAccepts(self):
+        matcher = PathMatcher({'record': '/records/record', 'any': '//x'})
+        root = XML('<records><record><x/></record><other/></records>')
+        self.assertEqual(('record',), matcher.accepts(root[0]))
+        self.assertEqual(('any',), matcher.accepts(root[0][0]))
+        self.assertEqual((), matcher.accepts(root[1]))
+        self.assertEqual((), matcher.accepts(root))
+
+    def testWildcard(self):
+        matcher = PathMatcher({'any': '/OAI-PMH/*/oai:record/oai:metadata/*'})
+        state = matcher.initial
+        for tag in ['OAI-PMH', '{%(oai)s}ListRecords' % namespaces, '{%(oai)s}record' % namespaces, '{%(oai)s}metadata' % namespaces]:
+            state = state.next(tag)
+            self.assertEqual((), state.accepts)
+        self.assertEqual(('any',), state.next('{%(oai_dc)s}dc' % namespaces).accepts)
+        self.assertEqual(('any',), state.next('dc').accepts)
+        self.assertEqual((), state.next('dc').next('dc').accepts)
+
+    def testDescendant(self):
+        matcher = PathMatcher({'record': '//oai:record'})
+        record = '{%(oai)s}record' % namespaces
+        self.assertEqual(('record',), matcher.initial.next(record).accepts)
+        state = matcher.initial.next('a').next('b')
+        self.assertEqual((), state.accepts)
+        self.assertEqual(('record',), state.next(record).accepts)
+        self.assertEqual(('record',), state.next(record).next(record).accepts)
+        self.assertEqual((), state.next(record).next('c').accepts)
+        self.assertEqual((), state.next('record').accepts)
+
+    def testDescendantInTheMiddle(self):
+        matcher = PathMatcher({'title': '/root//dc:title'})
+        title = '{%(dc)s}title' % namespaces
+        self.assertEqual((), matcher.initial.next(title).accepts)
+        self.assertEqual(('title',), matcher.initial.next('root').next(title).accepts)
+        self.assertEqual(('title',), matcher.initial.next('root').next('a').next('b').next(title).accepts)
+        self.assertEqual((), matcher.initial.next('other').next(title).accepts)
+
+    def testNamespaceWildcard(self):
+        matcher = PathMatcher({'dc': '/root/dc:*'})
+        root = matcher.initial.next('root')
+        self.assertEqual(('dc',), root.next('{%(dc)s}title' % namespaces).accepts)
+        self.assertEqual((), root.next('{%(dcterms)s}title' % namespaces).accepts)
+        self.assertEqual((), root.next('title').accepts)
+
+    def testOwnNamespaces(self):
+        matcher = PathMatcher({'x': '/my:root'}, namespaces=namespaces.copyUpdate({'my': 'u:ri/my#'}))
+        self.assertEqual(('x',), matcher.initial.next('{u:ri/my#}root').accepts)
+
+    def testAccepts(self):
+        matcher = PathMatcher({'record': '/records/record', 'any': '//x'})
+        root = XML('<records><record><x/></record><other/></records>')
+        self.assertEqual(('record',), matcher.accepts(root[0]))
+        self.assertEqual(('any',), matcher.accepts(root[0][0]))
+        self.assertEqual((), matcher.accepts(root[1]))
+        self.assertEqual((), matcher.accepts(root))
+
+    def testParsePath(self):
+        self.assertEqual(((False, '', 'a'), (False, 'u:ri/x#', 'b')), parsePath(['a', '{u:ri/x#}b']))
+        self.assertEqual(((True, namespaces.oai, 'record'),), parsePath('//oai:record'))
+        self.assertEqual(((False, None, None), (True, 'u:ri/x#', 'b'), (False, namespaces.dc, None)), parsePath('/*//{u:ri/x#}b/dc:*'))
+        self.assertRaises(ValueError, parsePath, 'a/b')
+        self.assertRaises(ValueError, parsePath, '/a/')
+        self.assertRaises(ValueError, parsePath, '/unknown:a')
+
+    def testParseFieldPath(self):
+        self.assertEqual(('/*/oai:header/oai:identifier', None), parseFieldPath('oai:header/oai:identifier'))
+        self.assertEqual(('/*//dc:title', None), parseFieldPath('//dc:title'))
+        self.assertEqual(('/*', None), parseFieldPath('.'))
+        self.assertEqual(('/*', 'status'), parseFieldPath('@status'))
+        self.assertEqual(('/*/oai:header', 'status'), parseFieldPath('oai:header/@status'))
+        self.assertEqual(('/*//*', 'id'), parseFieldPath('//@id'))
+        self.assertEqual(('/*/a', '{%(xml)s}lang' % namespaces), parseFieldPath('a/@xml:lang'))
+        self.assertRaises(ValueError, lambda: parseFieldPath('/a'))
+        self.assertRaises(ValueError, lambda: parseFieldPath('a/@*'))
+        self.assertRaises(ValueError, lambda: parseFieldPath('a/@unknown:x'))
@@ -24,7 +24,8 @@
 
 from unittest import TestCase
 
-from lxml.etree import tostring
+from lxml.etree import tostring, XMLSyntaxError
+from meresco.xml import namespaces
 from meresco.xml.pushparser import PushParser
 
 
@@ -41,3 +42,84 @@ class PushParserTest(TestCase):
 
         self.assertEqual(1, len(records))
         self.assertEqual(b'<record>aap</record>', tostring(records[0]))
+
+    def testFeedWithPathExpression(self):
+        records = []
+        parser = PushParser(elementPath="//oai:record", onResultDo=records.append)
+
+        parser.feed('<oai:OAI-PMH %(xmlns_oai)s><oai:ListRecords><oai:record>' % namespaces)
+        parser.feed("<oai:header/></oai:record><oai:record>aap</oai:record></oai:ListRecords></oai:OAI-PMH>")
+
+        self.assertEqual(2, len(records))
+        self.assertEqual('{%(oai)s}record' % namespaces, records[0].tag)
+
+    def testMinimalNsmap(self):
+        records = []
+        parser = PushParser(elementPath="//oai:record", onResultDo=records.append, minimalNsmap=True)
+
+        parser.feed('<oai:OAI-PMH %(xmlns_oai)s %(xmlns_xsi)s %(xmlns_dc)s><oai:ListRecords>' % namespaces)
+        parser.feed("<oai:record><oai:header/></oai:record></oai:ListRecords></oai:OAI-PMH>")
+
+        self.assertEqual('<oai:record xmlns:oai="%(oai)s"><oai:header/></oai:record>' % namespaces, tostring(records[0], encoding=str))
+
+    def testFeedLargeChunkWithSmallQueue(self):
+        records = []
+        parser = PushParser(elementPath=["records", "record"], onResultDo=records.append, maxSubtrees=3, feedSize=50)
+        parser.feed("<records>%s" % ("<record>aap</record>" * 100))
+        self.assertEqual(100, len(records))
+        self.assertEqual([], list(parser._builder.getSubtrees()))
+
+    def testNativeEngine(self):
+        for engine in ['native', 'auto']:
+            records = []
+            parser = PushParser(elementPath=["XML", "records", "record"], onResultDo=records.append, engine=engine)
+
+            parser.feed("<XML><records><record>")
+            parser.feed("aap</record><record>noot</record>")
+
+            self.assertEqual([b'<record>aap</record>', b'<record>noot</record>'], [tostring(r) for r in records])
+
+    def testAutoEngineFallsBackToTarget(self):
+        records = []
+        parser = PushParser(elementPath="//record", onResultDo=records.append, engine='auto')
+        self.assertEqual('SubTreesTreeBuilder', parser._builder.__class__.__name__)
+        parser.feed("<XML><records><record>aap</record></records><record>noot</record></XML>")
+        self.assertEqual(2, len(records))
+        self.assertRaises(ValueError, lambda: PushParser(elementPath="//record", onResultDo=records.append, engine='native'))
+        self.assertRaises(ValueError, lambda: PushParser(elementPath="//record", onResultDo=records.append, engine='other'))
+
+    def testClose(self):
+        for engine in ['target', 'native']:
+            records = []
+            parser = PushParser(elementPath=["records", "record"], onResultDo=records.append, engine=engine)
+            parser.feed("<records><record>aap</record></records>")
+            parser.close()
+            self.assertEqual(['aap'], [r.text for r in records])
+
+            parser = PushParser(elementPath=["records", "record"], onResultDo=records.append, engine=engine)
+            parser.feed("<records><record>aap</record>")
+            self.assertRaises(XMLSyntaxError, parser.close)
+
+    def testRaw(self):
+        for engine in ['target', 'native']:
+            for minimalNsmap in [False, True]:
+                records = []
+                parser = PushParser(elementPath="/oai:OAI-PMH/oai:ListRecords/oai:record", onResultDo=records.append, engine=engine, minimalNsmap=minimalNsmap, raw=True)
+                parser.feed('<oai:OAI-PMH %(xmlns_oai)s><oai:ListRecords><oai:record><oai:header>€</oai:header></oai:record></oai:ListRecords></oai:OAI-PMH>' % namespaces)
+                parser.close()
+                self.assertEqual([('<oai:record xmlns:oai="%(oai)s"><oai:header>€</oai:header></oai:record>' % namespaces).encode()], records)
+
+    def testNestedMatches(self):
+        records = []
+        parser = PushParser(elementPath="//b", onResultDo=records.append)
+        parser.feed('<a><b>1<b>2</b>3</b></a>')
+        parser.close()
+        self.assertEqual(['2', '123'], [''.join(record.itertext()) for record in records])
+
+    def testFields(self):
+        records = []
+        parser = PushParser(elementPath="//oai:record", onResultDo=records.append, engine='auto', fields={'identifier': 'oai:header/oai:identifier'})
+        parser.feed('<oai:OAI-PMH %(xmlns_oai)s><oai:record><oai:header><oai:identifier>id:1</oai:identifier></oai:header></oai:record></oai:OAI-PMH>' % namespaces)
+        parser.close()
+        self.assertEqual([{'identifier': ['id:1']}], records)
+        self.assertRaises(ValueError, lambda: PushParser(elementPath=["a", "b"], onResultDo=records.append, engine='native', fields={'x': 'x'}))
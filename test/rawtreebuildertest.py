@@ -0,0 +1,69 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from lxml.etree import XMLParser, TreeBuilder, tostring
+
+from meresco.xml.rawtreebuilder import RawTreeBuilder, rawTreeBuilderFactory
+from meresco.xml.subtreestreebuilder import SubTreesTreeBuilder
+
+
+class RawTreeBuilderTest(TestCase):
+    def testSameAsTostring(self):
+        self.assertSameAsTostring(b'<root><record>aap</record></root>')
+        self.assertSameAsTostring(b'<root xmlns="u:ri/d#" xmlns:a="u:ri/a#"><record xml:lang="nl" a:b="1&amp;&quot;&#10;&#9;&lt;&gt;"><y xmlns="">t&lt;&amp;&#13;&gt;<!--c--><?p d?><?q?></y><a:z xmlns:q="u:ri/q#" q:w="2"/>tail</record></root>')
+        self.assertSameAsTostring('<root><record>€ <empty/><empty></empty></record></root>'.encode())
+        self.assertSameAsTostring(b'<root xmlns:a="u:ri/a#"><a:record><a:x xmlns:a="u:ri/other#"><a:y/></a:x><a:z/></a:record></root>')
+
+    def testUndeclaredNamespaces(self):
+        builder = RawTreeBuilder()
+        builder.start('{u:ri/a#}a', {'{u:ri/b#}b': '1'}, {None: 'u:ri/a#'})
+        builder.start('x', {})
+        builder.end('x')
+        builder.start('{u:ri/a#}y', {'{u:ri/a#}c': '2'})
+        builder.end('{u:ri/a#}y')
+        builder.end('{u:ri/a#}a')
+        self.assertEqual(b'<a xmlns="u:ri/a#" xmlns:ns0="u:ri/b#" ns0:b="1"><x xmlns=""/><y xmlns:ns1="u:ri/a#" ns1:c="2"/></a>', builder.close())
+
+    def testScopesAreSharedPerFactory(self):
+        factory = rawTreeBuilderFactory()
+        first, second = factory(), factory()
+        self.assertTrue(first._scopes[0] is second._scopes[0])
+        self.assertFalse(first._scopes[0] is rawTreeBuilderFactory()()._scopes[0])
+        self.assertFalse(RawTreeBuilder()._scopes[0] is RawTreeBuilder()._scopes[0])
+        for builder in [first, second]:
+            builder.start('{u:ri/a#}a', {})
+            builder.end('{u:ri/a#}a')
+            self.assertEqual(b'<ns0:a xmlns:ns0="u:ri/a#"/>', builder.close())
+
+    def assertSameAsTostring(self, data):
+        results = []
+        for factory in [TreeBuilder, RawTreeBuilder]:
+            builder = SubTreesTreeBuilder(paths={'record': '/*/*'}, treeBuilderFactory=factory)
+            parser = XMLParser(target=builder)
+            parser.feed(data)
+            parser.close()
+            results.append([subtree if factory is RawTreeBuilder else tostring(subtree, encoding='utf-8', xml_declaration=False) for id, subtree in builder.getSubtrees()])
+        self.assertEqual(results[0], results[1])
@@ -0,0 +1,109 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from seecr.test import SeecrTestCase
+
+from os.path import join, isfile
+
+from lxml.etree import tostring
+from meresco.xml import namespaces
+from meresco.xml.recordindex import buildRecordIndex, RecordIndex
+from meresco.xml.subtreestreebuilder import SimpleSaxFileParser
+
+
+class RecordIndexTest(SeecrTestCase):
+    def setUp(self):
+        SeecrTestCase.setUp(self)
+        self.filename = join(self.tempdir, 'records.xml')
+
+    def testSameRecordsAsSequentialParser(self):
+        self.writeRecords(20)
+        path = '/oai:OAI-PMH/oai:ListRecords/oai:record'
+        expected = []
+        SimpleSaxFileParser(self.filename, path, callback=lambda subtree: expected.append(tostring(subtree))).start()
+
+        self.assertEqual(20, buildRecordIndex(self.filename, path))
+        self.assertTrue(isfile(self.filename + '.index'))
+        with RecordIndex(self.filename) as index:
+            self.assertEqual(20, len(index))
+            self.assertEqual(expected, [tostring(index.record(n)) for n in range(len(index))])
+            self.assertEqual(expected[3], tostring(index.record(3)))
+            self.assertTrue(index.recordData(3).startswith(b'<oai:record>'))
+            self.assertTrue(index.recordData(3).endswith(b'</oai:record>'))
+            self.assertRaises(IndexError, lambda: index.record(20))
+
+    def testByIdentifier(self):
+        self.writeRecords(10)
+        identifier = lambda record: record.findtext('{%(oai)s}header/{%(oai)s}identifier' % namespaces)
+        indexFilename = join(self.tempdir, 'other.index')
+        buildRecordIndex(self.filename, '//oai:record', identifier=identifier, indexFilename=indexFilename)
+        with RecordIndex(self.filename, indexFilename=indexFilename) as index:
+            self.assertEqual([7], index.numbers('id:7'))
+            records = index.byIdentifier('id:7')
+            self.assertEqual(['Title 7'], [r.findtext('.//{%(dc)s}title' % namespaces) for r in records])
+            self.assertEqual([], index.byIdentifier('id:none'))
+
+    def testWithoutIdentifiers(self):
+        self.writeRecords(1)
+        buildRecordIndex(self.filename, '//oai:record')
+        with RecordIndex(self.filename) as index:
+            self.assertRaises(ValueError, lambda: index.byIdentifier('id:0'))
+
+    def testEmptyElementsAndContexts(self):
+        with open(self.filename, 'wb') as f:
+            f.write('<?xml version="1.0" encoding="ISO-8859-1"?>\n<root><a xmlns:p="u:ri/p#"><p:r n="1 > 0"/><p:r>caf\xe9</p:r ></a><b xmlns:p="u:ri/other#"><p:r/></b></root>'.encode('iso-8859-1'))
+        buildRecordIndex(self.filename, '/root/*/*')
+        with RecordIndex(self.filename) as index:
+            self.assertEqual([b'<p:r n="1 > 0"/>', '<p:r>caf\xe9</p:r >'.encode('iso-8859-1'), b'<p:r/>'], [index.recordData(n) for n in range(3)])
+            self.assertEqual(['{u:ri/p#}r', '{u:ri/p#}r', '{u:ri/other#}r'], [index.record(n).tag for n in range(3)])
+            self.assertEqual('caf\xe9', index.record(1).text)
+            self.assertEqual('1 > 0', index.record(0).attrib['n'])
+
+    def testChangedFile(self):
+        self.writeRecords(2)
+        buildRecordIndex(self.filename, '//oai:record')
+        with open(self.filename, 'a') as f:
+            f.write('\n')
+        self.assertRaises(ValueError, lambda: RecordIndex(self.filename))
+
+    def testInternalDtdEntities(self):
+        with open(self.filename, 'w') as f:
+            f.write('<?xml version="1.0"?>\n<!DOCTYPE root [\n  <!ENTITY e "aap">\n  <!ENTITY x "<b>noot</b>">\n]>\n<root><r>&e;</r><r>&x;</r></root>')
+        self.assertEqual(2, buildRecordIndex(self.filename, '/root/r'))
+        with RecordIndex(self.filename) as index:
+            self.assertEqual(b'<r>&e;</r>', index.recordData(0))
+            self.assertEqual(['<r>aap</r>', '<r><b>noot</b></r>'], [tostring(index.record(n), encoding=str) for n in range(2)])
+
+    def testNotAnIndex(self):
+        self.writeRecords(1)
+        with open(self.filename + '.index', 'wb') as f:
+            f.write(b'MXRIDX1\n')
+        self.assertRaises(ValueError, lambda: RecordIndex(self.filename))
+
+    def writeRecords(self, count):
+        with open(self.filename, 'w') as f:
+            f.write('<?xml version="1.0"?>\n<oai:OAI-PMH %(xmlns_oai)s><oai:ListRecords>\n' % namespaces)
+            for i in range(count):
+                f.write(('<oai:record><oai:header><oai:identifier>id:%d</oai:identifier></oai:header><oai:metadata><oai_dc:dc %%(xmlns_oai_dc)s %%(xmlns_dc)s><dc:title>Title %d</dc:title></oai_dc:dc></oai:metadata></oai:record>\n' % (i, i)) % namespaces)
+            f.write('</oai:ListRecords></oai:OAI-PMH>\n')
@@ -25,12 +25,13 @@
 from seecr.test import SeecrTestCase
 
 from meresco.xml import namespaces
-from meresco.xml.subtreestreebuilder import SubTreesTreeBuilder, SimpleSaxFileParser
+from meresco.xml.subtreestreebuilder import SubTreesTreeBuilder, SimpleSaxFileParser, feedInSlices, createSubtreesParser
 
-from lxml.etree import parse, XMLParser, tostring
+from lxml.etree import parse, XMLParser, XMLSyntaxError, tostring
 
 from math import ceil
 from io import StringIO
+from os.path import join
 
 
 namespaces = namespaces.copyUpdate({
@@ -63,6 +64,13 @@ class SubTreesTreeBuilderTest(SeecrTestCase):
         self.assertEqualsLxml(xpathFirst(parseString(XML), '/records/record[2]'), result[1][1])
         self.assertEqualsLxml(xpathFirst(parseString(XML), '/records/record[3]'), result[2][1])
 
+    def testUnfinishedDocumentRaisesSyntaxError(self):
+        builder = SubTreesTreeBuilder(elementPath=['records', 'record'])
+        parser = XMLParser(target=builder)
+        parser.feed(b'<records><record><a>')
+        self.assertRaises(XMLSyntaxError, parser.close)
+        self.assertEqual([], list(builder.getSubtrees()))
+
     def testParseDifferentStructure(self):
         builder = SubTreesTreeBuilder(buildFor={
             'sub': lambda stack: [d['tag'] for d in stack] == ['root', 'sub']
@@ -107,6 +115,86 @@ class SubTreesTreeBuilderTest(SeecrTestCase):
             xpathFirst(parseString(XML), '/records'),
             result[5][1])
 
+    def testMultiplePathsWithNS(self):
+        builder = SubTreesTreeBuilder(paths={
+            'records': ['records'],
+            'record': ['records', 'record'],
+            'default-ns': ['records', 'record', '{u:ri/default#}subtag.NS'],
+            'prefixed': ['records', 'record', '{u:ri/prefixed#}fixed'],
+        })
+        result, loops = parseIncrementallyBy20(builder=builder, inputXml=XML)
+
+        self.assertEqual(['record', 'record', 'default-ns', 'prefixed', 'record', 'records'], [r[0] for r in result])
+        self.assertEqualsLxml(
+                xpathFirst(parseString(XML), '/records/record[3]/pre_:fixed'),
+            result[3][1])
+        self.assertEqualsLxml(
+            xpathFirst(parseString(XML), '/records'),
+            result[5][1])
+
+    def testPathsAndBuildForCombined(self):
+        builder = SubTreesTreeBuilder(
+            paths={'record': ['records', 'record']},
+            buildFor={'subtag': lambda stack: stack[-1]['tag'] == 'subtag'})
+        result, loops = parseIncrementallyBy20(builder=builder, inputXml=XML)
+
+        self.assertEqual(['subtag', 'record', 'record', 'record'], [r[0] for r in result])
+
+    def testPathExpressions(self):
+        builder = SubTreesTreeBuilder(paths={
+            'record': '/records/*',
+            'fixed': '//pre_:fixed',
+        }, namespaces=namespaces)
+        result, loops = parseIncrementallyBy20(builder=builder, inputXml=XML)
+
+        self.assertEqual(['record', 'record', 'fixed', 'record'], [r[0] for r in result])
+        self.assertEqualsLxml(
+                xpathFirst(parseString(XML), '/records/record[3]/pre_:fixed'),
+            result[2][1])
+
+    def testNestedMatchesOfTheSamePath(self):
+        builder = SubTreesTreeBuilder(paths={'b': '//b', 'a': '/a'})
+        parser = XMLParser(target=builder)
+        parser.feed('<a><b>1<b>2<b>3</b></b>4</b><b>5</b></a>')
+        parser.close()
+        self.assertEqual([
+                ('b', b'<b>3</b>'),
+                ('b', b'<b>2<b>3</b></b>'),
+                ('b', b'<b>1<b>2<b>3</b></b>4</b>'),
+                ('b', b'<b>5</b>'),
+                ('a', b'<a><b>1<b>2<b>3</b></b>4</b><b>5</b></a>'),
+            ], [(id, tostring(subtree)) for id, subtree in builder.getSubtrees()])
+
+    def testSimpleSaxFileParserWithNestedMatches(self):
+        for raw in [False, True]:
+            builder = SubTreesTreeBuilder(paths={'b': '//b'}, raw=raw)
+            parser = XMLParser(target=builder)
+            parser.feed('<a><b>1<b>2</b>3</b></a>')
+            parser.close()
+            self.assertEqual([b'<b>2</b>', b'<b>1<b>2</b>3</b>'], [subtree if raw else tostring(subtree) for id, subtree in builder.getSubtrees()])
+        subtrees = []
+        SimpleSaxFileParser(StringIO('<a><b>1<b>2</b>3</b></a>'), '//b', callback=lambda subtree: subtrees.append(tostring(subtree))).start()
+        self.assertEqual([b'<b>2</b>', b'<b>1<b>2</b>3</b>'], subtrees)
+
+    def testEnginesGiveTheSameSubtrees(self):
+        data = '''<OAI-PMH xmlns="%(oai)s" %(xmlns_xsi)s %(xmlns_dcterms)s xmlns:pre="u:ri/pre#"><ListRecords><record xmlns:extra="u:ri/extra#">
+<metadata><dc xmlns="%(dc)s"><date xsi:type="dcterms:W3CDTF">2026</date><pre:x xmlns:pre="u:ri/other#" extra:y="1" z="extra:q"/></dc></metadata>
+</record>\n<record><header/></record></ListRecords></OAI-PMH>''' % namespaces
+        for raw in [False, True]:
+            results = []
+            for engine in ['target', 'native', 'auto']:
+                parser, builder = createSubtreesParser({'record': '/oai:OAI-PMH/oai:ListRecords/oai:record'}, engine=engine, raw=raw)
+                parser.feed(data)
+                parser.close()
+                results.append([subtree if raw else tostring(subtree) for id, subtree in builder.getSubtrees()])
+            self.assertEqual(2, len(results[0]))
+            self.assertEqual([results[0]] * 3, results)
+            self.assertTrue(b' xmlns:dcterms="http://purl.org/dc/terms/"' in results[0][0])
+
+    def testAutoEngineWithMinimalNsmapIsTarget(self):
+        parser, builder = createSubtreesParser({'record': '/records/record'}, engine='auto', minimalNsmap=True)
+        self.assertEqual(SubTreesTreeBuilder, type(builder))
+
     def testIdentityTransformWithNS(self):
         builder = SubTreesTreeBuilder(buildFor={
             'one': lambda stack: [d['tag'] for d in stack] == ['{u:ri/default#}root'],
@@ -154,6 +242,49 @@ class SubTreesTreeBuilderTest(SeecrTestCase):
             xpathFirst(parseString(XML_NS), '/def_:root/def_:subInDefaultNS'),
             result[5][1])
 
+    def testNamespaceScopeIsSharedAlongTheStack(self):
+        scopes = {}
+        def collectScope(stack):
+            scopes[stack[-1]['tag'].split('}')[-1]] = stack[-1]['scope']
+            return False
+        builder = SubTreesTreeBuilder(buildFor={'none': collectScope})
+        parseIncrementallyBy20(builder=builder, inputXml=XML_NS)
+
+        root, subInDefaultNS, fixed, other, inside, newdefault, node = [scopes[tag] for tag in ['root', 'subInDefaultNS', 'fixed', 'other', 'inside', 'newdefault', 'node']]
+        self.assertEqual({None: 'u:ri/default#', 'pre': 'u:ri/prefixed#'}, root)
+        self.assertTrue(root is subInDefaultNS)
+        self.assertTrue(root is fixed)
+        self.assertEqual({None: 'u:ri/default#', 'pre': 'u:ri/other#'}, other)
+        self.assertTrue(other is inside)
+        self.assertEqual({None: 'u:ri/newdefault#', 'pre': 'u:ri/other#'}, newdefault)
+        self.assertTrue(newdefault is node)
+
+    def testSubtreeRootGetsNamespacesInScope(self):
+        builder = SubTreesTreeBuilder(paths={'inside': '//other_:inside'}, namespaces=namespaces)
+        result, loops = parseIncrementallyBy20(builder=builder, inputXml=XML_NS)
+
+        self.assertEqual(1, len(result))
+        self.assertEqual({None: 'u:ri/default#', 'pre': 'u:ri/other#'}, result[0][1].nsmap)
+
+    def testMinimalNsmap(self):
+        builder = SubTreesTreeBuilder(paths={'record': '/def_:root/def_:subInDefaultNS/other_:other'}, namespaces=namespaces, minimalNsmap=True)
+        result, loops = parseIncrementallyBy20(builder=builder, inputXml=XML_NS)
+
+        record = result[0][1]
+        self.assertEqual({'pre': 'u:ri/other#'}, record.nsmap)
+        self.assertEqual(b"""<pre:other xmlns:pre="u:ri/other#">
+        <pre:inside/>
+        <newdefault xmlns="u:ri/newdefault#">
+            <node/>
+        </newdefault>
+    </pre:other>""", tostring(record))
+
+    def testMinimalNsmapDeclaresInheritedNamespacesWhereUsed(self):
+        xml = StringIO("""<a xmlns="u:ri/default#" xmlns:pre="u:ri/prefixed#" xmlns:other="u:ri/other#"><b><c other:attr="x"/><pre:d/></b></a>""")
+        result = []
+        SimpleSaxFileParser(stream=xml, path='/{u:ri/default#}a/{u:ri/default#}b', callback=result.append, minimalNsmap=True).start()
+        self.assertEqual(b'<b xmlns="u:ri/default#"><c xmlns:other="u:ri/other#" other:attr="x"/><pre:d xmlns:pre="u:ri/prefixed#"/></b>', tostring(result[0]))
+
     def testSimpleSaxFileParser(self):
         xml = StringIO("""<a><b/><b/><c/><b/></a>""")
         result = []
@@ -163,6 +294,75 @@ class SubTreesTreeBuilderTest(SeecrTestCase):
         self.assertEqual(3, len(result))
         self.assertEqual('b', result[0].tag)
 
+    def testSimpleSaxFileParserWithPathExpression(self):
+        xml = StringIO("""<a><b/><x><b/></x><c/><b/></a>""")
+        result = []
+        saxfp = SimpleSaxFileParser(stream=xml, path='//b', callback=result.append)
+        saxfp.start()
+
+        self.assertEqual(3, len(result))
+
+    def testIsFull(self):
+        builder = SubTreesTreeBuilder(elementPath=['a', 'b'], maxSubtrees=2)
+        parser = XMLParser(target=builder)
+        parser.feed("<a><b/>")
+        self.assertFalse(builder.isFull())
+        parser.feed("<b/>")
+        self.assertTrue(builder.isFull())
+        self.assertEqual(['b', 'b'], [id for id, subtree in builder.getSubtrees()])
+        self.assertFalse(builder.isFull())
+        self.assertFalse(SubTreesTreeBuilder(elementPath=['a', 'b']).isFull())
+
+    def testFeedInSlicesDrainsWhenFull(self):
+        builder = SubTreesTreeBuilder(elementPath=['a', 'b'], maxSubtrees=2)
+        parser = XMLParser(target=builder)
+        drained = []
+        def processSubtrees():
+            drained.append(len(list(builder.getSubtrees())))
+        feedInSlices(parser, builder, "<a>" + "<b>x</b>" * 20, processSubtrees, feedSize=16)
+        self.assertEqual(20, sum(drained) + len(list(builder.getSubtrees())))
+        self.assertTrue(max(drained) <= 3, drained)
+
+    def testSimpleSaxFileParserNativeEngine(self):
+        xml = StringIO("""<a xmlns:x="u:ri/other#"><b/><b><x:c/></b><c/><b/></a>""")
+        result = []
+        SimpleSaxFileParser(stream=xml, path=['a', 'b'], callback=result.append, engine='native').start()
+
+        self.assertEqual([b'<b xmlns:x="u:ri/other#"/>', b'<b xmlns:x="u:ri/other#"><x:c/></b>', b'<b xmlns:x="u:ri/other#"/>'], [tostring(r) for r in result])
+        xml.seek(0)
+        targetResult = []
+        SimpleSaxFileParser(stream=xml, path=['a', 'b'], callback=targetResult.append, engine='target').start()
+        self.assertEqual([tostring(r) for r in targetResult], [tostring(r) for r in result])
+
+    def testSimpleSaxFileParserWithFilename(self):
+        filename = join(self.tempdir, 'records.xml')
+        with open(filename, 'w') as f:
+            f.write("<a>%s</a>" % ''.join("<b>%d</b>" % i for i in range(100)))
+        for engine in ['target', 'native']:
+            for fileInput in ['mmap', 'native']:
+                result = []
+                SimpleSaxFileParser(stream=filename, path=['a', 'b'], callback=result.append, engine=engine, fileInput=fileInput, maxSubtrees=2, feedSize=64).start()
+                self.assertEqual([str(i) for i in range(100)], [r.text for r in result], (engine, fileInput))
+
+        result = []
+        SimpleSaxFileParser(stream=filename, path=['a', 'b'], callback=result.append).start()
+        self.assertEqual(100, len(result))
+
+    def testSimpleSaxFileParserChunkSize(self):
+        reads = []
+        class Stream(StringIO):
+            def read(self, size):
+                reads.append(size)
+                return StringIO.read(self, size)
+        SimpleSaxFileParser(stream=Stream("<a><b/></a>"), path=['a', 'b'], callback=lambda subtree: None, chunkSize=1024 * 1024).start()
+        self.assertEqual([1024 * 1024, 1024 * 1024], reads)
+
+    def testSimpleSaxFileParserWithSmallQueue(self):
+        xml = StringIO("<a>%s</a>" % ("<b>x</b>" * 1000))
+        result = []
+        SimpleSaxFileParser(stream=xml, path=['a', 'b'], callback=result.append, maxSubtrees=5, feedSize=100).start()
+        self.assertEqual(1000, len(result))
+
     def testOnResult(self):
         trees = []
         def onResult(tree):
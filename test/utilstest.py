@@ -24,7 +24,7 @@
 
 from seecr.test import SeecrTestCase
 
-from meresco.xml.utils import sortRootTagAttrib, createElement, createSubElement
+from meresco.xml.utils import sortRootTagAttrib, createElement, createSubElement, internalSubset
 from meresco.xml import namespaces
 
 class UtilsTest(SeecrTestCase):
@@ -49,4 +49,12 @@ class UtilsTest(SeecrTestCase):
         dc = createElement('dc:title', nsmap=namespaces.select('dc'), attrib={'key':'\x0b\x1e\x1f\x01Text'})
         self.assertXmlEquals('<dc:title xmlns:dc="http://purl.org/dc/elements/1.1/" key="Text"/>', dc)
 
+    def testInternalSubset(self):
+        doctype = b'<!DOCTYPE root [\n  <!ENTITY e "a > b">\n  <!-- <root> -->\n]>'
+        self.assertEqual(doctype, internalSubset(b'<?xml version="1.0"?>\n<!-- c -->' + doctype + b'\n<root>&e;</root>'))
+        self.assertEqual(doctype, internalSubset(doctype + b'<root><unfinished'))
+        self.assertEqual(b'', internalSubset(b'<!DOCTYPE root SYSTEM "root.dtd"><root/>'))
+        self.assertEqual(b'', internalSubset(b'<root/>'))
+        self.assertEqual(b'', internalSubset(b''))
+
         
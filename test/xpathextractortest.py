@@ -0,0 +1,90 @@
+## begin license ##
+#
+# "Meresco-Xml" is a set of components and tools for handling xml data objects.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco-Xml"
+#
+# "Meresco-Xml" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco-Xml" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco-Xml"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from lxml.etree import XML, XPathEvalError
+
+from meresco.xml import namespaces
+from meresco.xml.xpathextractor import XPathExtractor
+
+
+RECORD = XML('''<oai:record %(xmlns_oai)s %(xmlns_dc)s %(xmlns_oai_dc)s>
+    <oai:header status="deleted"><oai:identifier>id:1</oai:identifier><oai:datestamp>2026-01-01</oai:datestamp></oai:header>
+    <oai:metadata><oai_dc:dc>
+        <dc:title xml:lang="nl">Een <b>vette</b> titel<!-- c --> zonder <dc:title>binnen</dc:title> eind</dc:title>
+        <dc:title xml:lang="en">A title</dc:title>
+        <dc:subject>one</dc:subject><dc:subject/><dc:subject>three</dc:subject>
+    </oai_dc:dc></oai:metadata>
+</oai:record>''' % namespaces)
+
+
+class XPathExtractorTest(TestCase):
+    def testSameAsXpath(self):
+        paths = {
+            'identifier': 'oai:header/oai:identifier/text()',
+            'status': 'oai:header/@status',
+            'header': 'oai:header',
+            'titles': '//dc:title/text()',
+            'nestedTitles': './/dc:title/text()',
+            'descendantTitles': 'oai:metadata//dc:title/text()',
+            'languages': 'oai:metadata/*/dc:title/@xml:lang',
+            'subjects': 'oai:metadata/oai_dc:dc/dc:subject/text()',
+            'subjectElements': 'oai:metadata/oai_dc:*/dc:subject',
+            'self': '.',
+            'selfText': 'text()',
+            'selfAttribute': '@status',
+            'relative': './oai:header/*',
+            'missing': 'oai:about/text()',
+            'second': 'oai:metadata/*/dc:subject[2]',
+            'count': 'count(//dc:subject)',
+            'string': 'string(oai:header/oai:identifier)',
+            'union': 'oai:header/oai:identifier/text()|oai:header/oai:datestamp/text()',
+        }
+        extractor = XPathExtractor(paths)
+        result = extractor.extract(RECORD)
+        self.assertEqual(list(paths), list(result))
+        for name, path in paths.items():
+            self.assertEqual(namespaces.xpath(RECORD, path), result[name], name)
+        self.assertEqual(['Een ', ' titel', ' zonder ', 'binnen', ' eind', 'A title'], result['descendantTitles'])
+        self.assertEqual(result, extractor.extract(RECORD))
+
+    def testExtractFirst(self):
+        extractor = XPathExtractor({
+            'identifier': 'oai:header/oai:identifier/text()',
+            'subject': '//dc:subject/text()',
+            'second': 'oai:metadata/*/dc:subject[3]/text()',
+            'missing': 'oai:about',
+        })
+        self.assertEqual({'identifier': 'id:1', 'subject': 'one', 'second': 'three', 'missing': None}, extractor.extractFirst(RECORD))
+
+    def testBoundToNamespaces(self):
+        record = XML('<record xmlns:x="u:ri/x#"><x:title>t</x:title></record>')
+        ns = namespaces.copyUpdate({'dc': 'u:ri/x#'})
+        self.assertEqual({'title': ['t']}, XPathExtractor({'title': 'dc:title/text()'}, namespaces=ns).extract(record))
+        self.assertEqual({'title': []}, XPathExtractor({'title': 'dc:title/text()'}).extract(record))
+
+    def testUnknownPrefix(self):
+        extractor = XPathExtractor({'title': 'unknown:title'})
+        self.assertRaises(XPathEvalError, lambda: extractor.extract(RECORD))